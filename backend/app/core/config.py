@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict
 
 class Settings(BaseSettings):
     APP_NAME: str = "ai-secure"
@@ -24,6 +24,12 @@ class Settings(BaseSettings):
     # Telegram configuration
     TELEGRAM_BOT_TOKEN: Optional[str] = None
     TELEGRAM_CHAT_ID: Optional[str] = None
+    TELEGRAM_API_URL: Optional[str] = None  # e.g. "http://127.0.0.1:8081/bot{0}/{1}" for a local fake API
+    TELEGRAM_RATE_PER_SEC: float = 1.0  # per-chat message rate
+    TELEGRAM_BURST: int = 3
+    ALERT_QUEUE_SIZE: int = 128
+    ALERT_COALESCE_SECONDS: float = 3.0  # bursts per camera+label within this window become one message
+    ALERT_MEDIA_GROUP_MAX: int = 4
 
     CLOUDINARY_CLOUD_NAME: Optional[str] = None
     CLOUDINARY_API_KEY: Optional[str] = None
@@ -64,9 +70,130 @@ class Settings(BaseSettings):
         "Vandalism.pt": "https://github.com/Suvintm/securo/releases/download/v1.0.0/Vandalism.pt",
     }
 
+    # SHA-256 of each checkpoint in MODEL_URLS; downloads that do not match are rejected
+    MODEL_SHA256: Dict[str, str] = {}
+    MODEL_STORE_DIR: Optional[str] = None  # content-addressed download store (defaults to ai_models/.store); may be a shared mount
+    MODEL_DOWNLOAD_TIMEOUT: float = 30.0
+    MODEL_DOWNLOAD_RETRIES: int = 5
+
+    # Model loading: "independent" runs each checkpoint on its own,
+    # "shared" fuses them into one multi-head model that dedupes identical backbone layers
+    MODEL_LOADER_MODE: str = "independent"
+    MODEL_LOAD_WORKERS: int = 4  # background threads loading models at startup
+    MODEL_MEMORY_BUDGET_MB: float = 0  # 0 = unlimited; above it, inactive models are evicted LRU-first
+
+    # Inference backend per model: "pt", "torchscript", "onnx" or "openvino".
+    # Non-pt backends are exported once into MODEL_ARTIFACT_DIR and checked against the .pt before use.
+    MODEL_BACKENDS: Dict[str, str] = {
+        "default": "pt",
+    }
+    MODEL_ARTIFACT_DIR: Optional[str] = None  # defaults to ai_models/.artifacts
+    MODEL_COMPILED_CACHE: bool = True  # keep fused models on disk (keyed by weights, torch version, device)
+    MODEL_CALIBRATION_IMAGE: Optional[str] = None  # parity-check image (a seeded synthetic frame if unset)
+    MODEL_PARITY_SCORE_ATOL: float = 0.02  # max abs difference of objectness/class scores
+    MODEL_PARITY_BOX_ATOL: float = 2.0  # max abs difference of box coordinates, in pixels
+
+    # INT8 post-training quantization (python -m app.features.yolo.quantize --calib <frames dir>)
+    QUANT_MAX_MAP_DELTA: float = 0.02  # refuse to promote an INT8 model losing more mAP50-95 than this
+    MODEL_PREFER_QUANTIZED: bool = True  # load a promoted INT8 artifact instead of MODEL_BACKENDS
+
     # Persistence Logic
     DETECTION_PERSISTENCE_SECONDS: float = 5.0
 
+    # Object tracking (ByteTrack-style): persistence and alert cooldown are evaluated per track
+    TRACK_HIGH_CONF: float = 0.5  # detections at or above this start tracks and are matched first
+    TRACK_MATCH_IOU: float = 0.3  # minimum IoU for high-confidence matches
+    TRACK_LOW_MATCH_IOU: float = 0.5  # minimum IoU for the low-confidence second pass
+    TRACK_MIN_HITS: int = 2  # matches before a track is confirmed
+    TRACK_MAX_LOST_SECONDS: float = 1.5  # unmatched tracks survive this long (flicker tolerance)
+    TRACK_ALERT_COOLDOWN_SECONDS: float = 30.0  # a persisting track re-alerts at most this often
+    TRACK_ALERT_GRACE_SECONDS: float = 1.0  # time below the alert threshold before persistence restarts
+
+    # Batched inference across cameras
+    INFERENCE_MAX_BATCH: int = 8
+    INFERENCE_MAX_WAIT_MS: float = 15.0
+
+    # Per-model inference cadence (Hz per camera, 0 = every frame) and priority (higher = degraded last)
+    MODEL_TARGET_HZ: Dict[str, float] = {
+        "weapon": 0,
+        "people": 10,
+        "shoplifting": 10,
+        "Accident": 5,
+        "Vandalism": 5,
+        "fire": 2,
+        "crowd": 1,
+        "default": 0,
+    }
+    MODEL_PRIORITIES: Dict[str, int] = {
+        "weapon": 10,
+        "people": 8,
+        "shoplifting": 6,
+        "Accident": 5,
+        "Vandalism": 4,
+        "fire": 3,
+        "crowd": 1,
+        "default": 5,
+    }
+    INFERENCE_CPU_BUDGET: float = 0.85  # share of scheduler time spent inferring before low-priority models slow down
+    INFERENCE_MIN_RATE_SCALE: float = 0.1  # a degraded model never drops below this fraction of its rate
+
+    # Model cascade: a specialist only runs on a camera while its trigger model found something with
+    # at least `min_conf` within the last `window_frames` inferred frames. With `roi_crops` it runs on
+    # padded crops (`roi_pad` of the box size, at least `roi_min_size` px) around those detections.
+    MODEL_CASCADE: Dict[str, Dict[str, Any]] = {
+        "weapon": {"requires": "people", "min_conf": 0.5, "window_frames": 15, "roi_crops": False},
+        "shoplifting": {"requires": "people", "min_conf": 0.5, "window_frames": 15, "roi_crops": False},
+        "Vandalism": {"requires": "people", "min_conf": 0.5, "window_frames": 15, "roi_crops": False},
+    }
+
+    # Per-camera pipeline stages
+    CAPTURE_VID_STRIDE: int = 1  # retrieve every Nth grabbed frame
+    PIPELINE_RESULT_QUEUE_SIZE: int = 2  # inference -> annotate backlog before dropping oldest
+
+    # Motion gating: skip inference on frames where nothing changed
+    MOTION_GATING_ENABLED: bool = True
+    MOTION_DOWNSCALE_WIDTH: int = 160  # frames are compared at this width
+    MOTION_PIXEL_THRESHOLD: int = 25  # grayscale difference that counts as a changed pixel
+    MOTION_MIN_AREA: float = 0.005  # fraction of changed pixels (inside the regions) that counts as motion
+    MOTION_KEYFRAME_SECONDS: float = 5.0  # always run inference at least this often
+    MOTION_REGIONS: Dict[str, List[List[List[float]]]] = {}  # camera id -> polygons in normalized [x, y] points
+    # Keyframe mode: while the scene moves, detect every N-th frame and propagate tracks in between
+    KEYFRAME_MIN_INTERVAL: int = 1  # N in a busy scene (1 = every moving frame)
+    KEYFRAME_MAX_INTERVAL: int = 4  # N when motion is just above MOTION_MIN_AREA
+    KEYFRAME_MOTION_HIGH: float = 0.05  # changed-area fraction at which N reaches KEYFRAME_MIN_INTERVAL
+
+    # Tiled / ROI inference: large frames are cut into overlapping tiles instead of being downscaled to 640
+    INFERENCE_TILE_MIN_WIDTH: int = 3840  # frames at least this wide (4K) are tiled (0 = never)
+    INFERENCE_TILE_SIZE: int = 640  # tile side in pixels (rounded to the model stride)
+    INFERENCE_TILE_OVERLAP: float = 0.2  # fraction of a tile shared with its neighbour
+    INFERENCE_TILE_MAX_BATCH: int = 16  # tiles per forward pass (all cameras together)
+    INFERENCE_TILE_MODELS: List[str] = ["weapon"]  # models tiled on large frames (empty = all)
+    INFERENCE_ROI_REGIONS: Dict[str, List[List[List[float]]]] = {}  # camera id -> polygons; only these parts are inferred
+
+    # Anomaly persistence worker
+    PERSIST_QUEUE_SIZE: int = 256
+    PERSIST_BATCH_SIZE: int = 20
+    PERSIST_FLUSH_MS: int = 500
+    PERSIST_UPLOAD_WORKERS: int = 4
+    PERSIST_MAX_RETRIES: int = 5
+    PERSIST_RETRY_BASE_SECONDS: float = 0.5
+
+    # Pre/post-event clips from an in-memory ring buffer of encoded frames
+    CLIP_RECORDING_ENABLED: bool = True
+    CLIP_PRE_SECONDS: float = 5.0
+    CLIP_POST_SECONDS: float = 5.0
+    CLIP_BUFFER_MB: int = 48  # per camera; must hold CLIP_PRE_SECONDS (or CLIP_POST_SECONDS) of JPEG frames
+    CLIP_WRITER_WORKERS: int = 2
+    CLIP_DIR: Optional[str] = None  # defaults to ./clips
+    CLIP_UPLOAD: bool = True  # upload to Cloudinary; otherwise only the local path is linked
+
+    # Thread -> event loop bridge
+    LOOP_BRIDGE_MAX_INFLIGHT: int = 64  # coroutines submitted from threads but not finished yet
+
+    # WebSocket fan-out
+    WS_CLIENT_QUEUE_SIZE: int = 100  # per-client backlog before the oldest events are dropped
+    WS_SEND_TIMEOUT_SECONDS: float = 5.0  # a client that cannot take one message in this time is evicted
+
     class Config:
         env_file = ".env"
         extra = "ignore"
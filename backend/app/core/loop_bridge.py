@@ -0,0 +1,109 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Dict, Optional
+from app.core.config import get_settings
+
+
+class LoopBridge:
+    """
+    Hands work from worker threads (cameras, persistence, alerts) to the
+    server's asyncio loop.
+
+    The loop is captured once at startup; threads then call submit() with a
+    coroutine, which is scheduled with run_coroutine_threadsafe instead of
+    spinning up a throwaway loop per event. The number of unfinished
+    coroutines is bounded: when the loop falls behind, new work is dropped
+    and counted rather than piling up.
+    """
+
+    def __init__(self, max_inflight: int):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.max_inflight = max(1, max_inflight)
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "dropped_full": 0,
+            "dropped_no_loop": 0,
+        }
+
+    # ---------- Lifecycle ----------
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """Capture the running server loop (call from the startup hook)."""
+        self.loop = loop
+        print("[LOOP] ✅ Event loop bridge attached.")
+
+    def detach(self):
+        self.loop = None
+
+    @property
+    def ready(self) -> bool:
+        return self.loop is not None and not self.loop.is_closed()
+
+    # ---------- Thread-side API ----------
+    def submit(self, coro: Coroutine) -> Optional[Future]:
+        """
+        Schedule `coro` on the server loop. Safe to call from any thread, never blocks.
+        Returns a concurrent Future, or None if the coroutine was dropped.
+        """
+        if not self.ready:
+            coro.close()
+            self._bump("dropped_no_loop")
+            return None
+
+        with self._lock:
+            if self._inflight >= self.max_inflight:
+                self.stats["dropped_full"] += 1
+                coro.close()
+                return None
+            self._inflight += 1
+            self.stats["submitted"] += 1
+
+        try:
+            fut = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        except RuntimeError:
+            # Loop closed between the check and the call
+            coro.close()
+            with self._lock:
+                self._inflight -= 1
+                self.stats["dropped_no_loop"] += 1
+            return None
+
+        fut.add_done_callback(self._on_done)
+        return fut
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["inflight"] = self._inflight
+        stats["max_inflight"] = self.max_inflight
+        stats["attached"] = self.ready
+        return stats
+
+    def _on_done(self, fut: Future):
+        failed = fut.cancelled() or fut.exception() is not None
+        with self._lock:
+            self._inflight -= 1
+            self.stats["failed" if failed else "completed"] += 1
+        if failed and not fut.cancelled():
+            print(f"[LOOP] ❌ Background coroutine failed: {fut.exception()}")
+
+    def _bump(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+
+_bridge: Optional[LoopBridge] = None
+_bridge_lock = threading.Lock()
+
+
+def get_loop_bridge() -> LoopBridge:
+    global _bridge
+    if _bridge is None:
+        with _bridge_lock:
+            if _bridge is None:
+                _bridge = LoopBridge(get_settings().LOOP_BRIDGE_MAX_INFLIGHT)
+    return _bridge
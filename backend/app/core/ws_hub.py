@@ -0,0 +1,135 @@
+import asyncio
+import json
+from typing import Any, Dict, Iterable, Optional, Set
+from fastapi import WebSocket
+from app.core.config import get_settings
+
+
+def _topic_set(values: Optional[Iterable[Any]]) -> Optional[Set[str]]:
+    """None / empty means 'everything'; otherwise a set of string ids."""
+    if not values:
+        return None
+    if isinstance(values, str):
+        values = values.split(",")
+    topics = {str(v).strip() for v in values if str(v).strip()}
+    return topics or None
+
+
+class HubClient:
+    """One WebSocket connection with its own bounded outbound queue and writer task."""
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self.cameras: Optional[Set[str]] = None
+        self.labels: Optional[Set[str]] = None
+        self.writer: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.dropped = 0
+
+    def subscribe(self, cameras=None, labels=None):
+        self.cameras = _topic_set(cameras)
+        self.labels = _topic_set(labels)
+
+    def wants(self, camera_id: Optional[str], label: Optional[str]) -> bool:
+        if self.cameras is not None and str(camera_id) not in self.cameras:
+            return False
+        if self.labels is not None and str(label) not in self.labels:
+            return False
+        return True
+
+    def offer(self, message: str):
+        """Enqueue without waiting; a full queue loses its oldest message."""
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(message)
+
+
+class WebSocketHub:
+    """
+    Fan-out of JSON events to many WebSocket clients.
+
+    broadcast() serializes a message once and drops it into each matching
+    client's queue; every client drains its queue in its own writer task,
+    so a slow or hung browser only delays (and eventually evicts) itself.
+    Clients can narrow what they receive to specific cameras and labels.
+    """
+
+    def __init__(self, queue_size: int, send_timeout: float):
+        self.queue_size = max(1, queue_size)
+        self.send_timeout = send_timeout
+        self.clients: Set[HubClient] = set()
+        self.stats = {"broadcasts": 0, "delivered": 0, "dropped": 0, "evicted": 0}
+
+    # ---------- Connections ----------
+    def register(self, websocket: WebSocket, cameras=None, labels=None) -> HubClient:
+        client = HubClient(websocket, self.queue_size)
+        client.subscribe(cameras, labels)
+        client.writer = asyncio.create_task(self._writer(client))
+        self.clients.add(client)
+        return client
+
+    async def unregister(self, client: HubClient):
+        if client not in self.clients:
+            return
+        self.clients.discard(client)
+        self.stats["dropped"] += client.dropped
+        if client.writer and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+
+    # ---------- Publishing ----------
+    def broadcast(self, data: Dict[str, Any]) -> int:
+        """Queue `data` for every subscribed client (loop thread only, never awaits). Returns the recipient count."""
+        self.stats["broadcasts"] += 1
+        camera_id, label = data.get("camera_id"), data.get("label")
+        targets = [c for c in self.clients if c.wants(camera_id, label)]
+        if not targets:
+            return 0
+
+        message = json.dumps(data, default=str)  # ✅ Serialize once for everyone
+        for client in targets:
+            client.offer(message)
+        return len(targets)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["clients"] = len(self.clients)
+        stats["dropped"] += sum(c.dropped for c in self.clients)
+        stats["queued"] = sum(c.queue.qsize() for c in self.clients)
+        return stats
+
+    # ---------- Writer ----------
+    async def _writer(self, client: HubClient):
+        try:
+            while True:
+                message = await client.queue.get()
+                await asyncio.wait_for(client.websocket.send_text(message), self.send_timeout)
+                client.sent += 1
+                self.stats["delivered"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Dead or hung client: evict it so it cannot hold anything up
+            print(f"[WS] ⚠️ Evicting WebSocket client: {type(e).__name__} {e}")
+            self.stats["evicted"] += 1
+            await self.unregister(client)
+            try:
+                await client.websocket.close()
+            except Exception:
+                pass
+
+
+_hub: Optional[WebSocketHub] = None
+
+
+def get_ws_hub() -> WebSocketHub:
+    """Hub shared by all WebSocket routes (only touched from the event loop)."""
+    global _hub
+    if _hub is None:
+        settings = get_settings()
+        _hub = WebSocketHub(settings.WS_CLIENT_QUEUE_SIZE, settings.WS_SEND_TIMEOUT_SECONDS)
+    return _hub
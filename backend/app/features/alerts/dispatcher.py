@@ -0,0 +1,216 @@
+import cv2
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from telebot import apihelper, types
+from app.core.config import get_settings
+from app.features.alerts import telegram_bot
+
+
+class TokenBucket:
+    """Simple blocking token bucket: `rate` tokens per second, up to `burst` stored."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = max(rate, 1e-6)
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping if necessary. Returns the time waited in seconds."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def penalize(self, seconds: float):
+        """Server told us to back off (HTTP 429 retry_after): drain the bucket for that long."""
+        with self._lock:
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+class _Burst:
+    """Detections of one (camera, label) collected during the coalescing window."""
+
+    __slots__ = ("camera", "anomaly", "count", "frames", "deadline")
+
+    def __init__(self, anomaly: Dict[str, Any], frame, camera: Dict[str, Any], window: float):
+        self.camera = camera
+        self.anomaly = anomaly
+        self.count = 1
+        self.frames = [frame]
+        self.deadline = time.monotonic() + window
+
+    def add(self, anomaly: Dict[str, Any], frame, max_frames: int):
+        self.count += 1
+        if anomaly.get("confidence", 0) > self.anomaly.get("confidence", 0):
+            self.anomaly = anomaly
+        if len(self.frames) < max_frames:
+            self.frames.append(frame)
+        else:
+            self.frames[-1] = frame  # always keep the most recent snapshot
+
+
+class AlertDispatcher:
+    """
+    Sends Telegram alerts off the detection hot path.
+
+    Camera threads call submit() (non-blocking, bounded queue). A worker
+    coalesces bursts per camera and label during ALERT_COALESCE_SECONDS into
+    a single photo or media group, JPEG-encodes the snapshots, and respects
+    Telegram's per-chat limits with a token bucket.
+    """
+
+    def __init__(self, bot=None, chat_id: Optional[str] = None):
+        settings = get_settings()
+        self.bot = bot or telegram_bot.bot
+        self.chat_id = chat_id or telegram_bot.CHAT_ID
+        self.window = settings.ALERT_COALESCE_SECONDS
+        self.max_frames = max(1, min(10, settings.ALERT_MEDIA_GROUP_MAX))  # Telegram allows 2-10 per group
+        self.bucket = TokenBucket(settings.TELEGRAM_RATE_PER_SEC, settings.TELEGRAM_BURST)
+        self.max_retries = 3
+
+        self.queue: "queue.Queue" = queue.Queue(maxsize=settings.ALERT_QUEUE_SIZE)
+        self._bursts: Dict[Tuple[str, str], _Burst] = {}
+        self._lock = threading.Lock()
+        self.active = False
+        self.thread: Optional[threading.Thread] = None
+
+        self.stats = {
+            "accepted": 0,
+            "dropped": 0,
+            "coalesced": 0,
+            "messages_sent": 0,
+            "photos_sent": 0,
+            "send_failures": 0,
+            "rate_limited_seconds": 0.0,
+        }
+
+    # ---------- Lifecycle ----------
+    def start(self):
+        if self.active:
+            return
+        self.active = True
+        self.thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        self.thread.start()
+        print("[Telegram] 🚀 Alert dispatcher started.")
+
+    def stop(self, timeout: float = 5.0):
+        self.active = False
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=timeout)
+        print("[Telegram] 🛑 Alert dispatcher stopped.")
+
+    # ---------- Producer API ----------
+    def submit(self, anomaly: Dict[str, Any], frame, camera: Dict[str, Any]) -> bool:
+        """Queue an alert. Never blocks; returns False (and counts a drop) if the queue is full."""
+        if not self.active:
+            self.start()
+        try:
+            self.queue.put_nowait((anomaly, frame, camera))
+        except queue.Full:
+            self._bump("dropped")
+            return False
+        self._bump("accepted")
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["queue_depth"] = self.queue.qsize()
+        stats["queue_maxsize"] = self.queue.maxsize
+        stats["open_bursts"] = len(self._bursts)
+        return stats
+
+    # ---------- Worker ----------
+    def _run(self):
+        while self.active or self._bursts or not self.queue.empty():
+            timeout = 0.5
+            if self._bursts:
+                next_deadline = min(b.deadline for b in self._bursts.values())
+                timeout = max(0.0, min(timeout, next_deadline - time.monotonic()))
+
+            try:
+                anomaly, frame, camera = self.queue.get(timeout=timeout)
+                key = (str(camera.get("id", camera.get("name", "camera"))), str(anomaly.get("label")))
+                burst = self._bursts.get(key)
+                if burst is None:
+                    self._bursts[key] = _Burst(anomaly, frame, camera, self.window)
+                else:
+                    burst.add(anomaly, frame, self.max_frames)
+                    self._bump("coalesced")
+            except queue.Empty:
+                pass
+
+            now = time.monotonic()
+            for key in [k for k, b in self._bursts.items() if b.deadline <= now or not self.active]:
+                self._send(self._bursts.pop(key))
+
+    def _send(self, burst: _Burst):
+        caption = telegram_bot.build_caption(burst.anomaly, burst.camera, burst.count)
+        photos = [buf for buf in (self._encode(f) for f in burst.frames) if buf is not None]
+        if not photos:
+            return
+
+        for attempt in range(self.max_retries + 1):
+            waited = self.bucket.acquire()
+            if waited:
+                self._bump("rate_limited_seconds", round(waited, 3))
+            try:
+                if len(photos) == 1:
+                    self.bot.send_photo(self.chat_id, photos[0], caption=caption)
+                else:
+                    media = [
+                        types.InputMediaPhoto(p, caption=caption if i == 0 else None)
+                        for i, p in enumerate(photos)
+                    ]
+                    self.bot.send_media_group(self.chat_id, media)
+                self._bump("messages_sent")
+                self._bump("photos_sent", len(photos))
+                print(f"[Telegram] ✅ Alert sent for {burst.anomaly.get('label')} ({burst.count} detection(s))")
+                return
+            except apihelper.ApiTelegramException as e:
+                retry_after = (e.result_json.get("parameters") or {}).get("retry_after")
+                if e.error_code == 429 and retry_after and attempt < self.max_retries:
+                    print(f"[Telegram] ⏳ Rate limited by Telegram, retrying in {retry_after}s")
+                    self.bucket.penalize(float(retry_after))
+                    continue
+                print(f"[Telegram] ❌ Failed to send alert: {e}")
+                break
+            except Exception as e:
+                print(f"[Telegram] ❌ Failed to send alert: {e}")
+                break
+
+        self._bump("send_failures")
+
+    @staticmethod
+    def _encode(frame) -> Optional[bytes]:
+        ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        return buffer.tobytes() if ok else None
+
+    def _bump(self, key: str, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+
+_dispatcher: Optional[AlertDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_alert_dispatcher() -> AlertDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = AlertDispatcher()
+    return _dispatcher
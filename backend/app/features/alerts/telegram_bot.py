@@ -1,4 +1,5 @@
 import telebot
+from telebot import apihelper
 import io
 from PIL import Image
 from app.core.config import get_settings
@@ -9,8 +10,29 @@ settings = get_settings()
 TELEGRAM_TOKEN = settings.TELEGRAM_BOT_TOKEN or "8493100424:AAGiwuPiZfKKa5u_wS1gWokqJdw4dKqMUBk"
 CHAT_ID = settings.TELEGRAM_CHAT_ID or "7133500274"
 
+# Optional API endpoint override, e.g. a local fake server for tests:
+# TELEGRAM_API_URL=http://127.0.0.1:8081/bot{0}/{1}
+if settings.TELEGRAM_API_URL:
+    apihelper.API_URL = settings.TELEGRAM_API_URL
+
 bot = telebot.TeleBot(TELEGRAM_TOKEN, threaded=False)
 
+
+def build_caption(anomaly, camera, count: int = 1) -> str:
+    """Alert caption; `count` > 1 when several detections were coalesced into one message."""
+    caption = (
+        f"🚨 Anomaly Detected!\n\n"
+        f"📷 Camera: {camera.get('name', 'Unknown')} ({camera.get('location', 'N/A')})\n"
+        f"🤖 Model: {anomaly.get('model', 'Unknown')}\n"
+        f"🏷️ Label: {anomaly.get('label', 'Unknown')}\n"
+        f"🎯 Confidence: {anomaly.get('confidence', 0):.2f}\n"
+        f"⏰ Time: {anomaly.get('timestamp', 'N/A')}"
+    )
+    if count > 1:
+        caption += f"\n🔁 Repeated: {count} detections"
+    return caption
+
+
 def send_alert(anomaly, frame, camera):
     """
     Sends an alert message with image to Telegram when anomaly is detected.
@@ -22,14 +44,7 @@ def send_alert(anomaly, frame, camera):
         img.save(bio, format="JPEG")
         bio.seek(0)
 
-        caption = (
-            f"🚨 Anomaly Detected!\n\n"
-            f"📷 Camera: {camera.get('name', 'Unknown')} ({camera.get('location', 'N/A')})\n"
-            f"🤖 Model: {anomaly.get('model', 'Unknown')}\n"
-            f"🏷️ Label: {anomaly.get('label', 'Unknown')}\n"
-            f"🎯 Confidence: {anomaly.get('confidence', 0):.2f}\n"
-            f"⏰ Time: {anomaly.get('timestamp', 'N/A')}"
-        )
+        caption = build_caption(anomaly, camera)
 
         bot.send_photo(CHAT_ID, bio, caption=caption)
         print(f"[Telegram] ✅ Alert sent successfully for {anomaly.get('label')}")
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+
+class FrameBroadcaster:
+    """
+    Encode-once fan-out for one camera's MJPEG feed.
+
+    The encode stage publishes each JPEG exactly once with an increasing
+    sequence number. Async viewers await the next sequence; a slow viewer
+    simply gets the newest frame when it is ready again, skipping the ones
+    in between, so N viewers cost the same encode CPU as one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seq = 0
+        self.frame: Optional[bytes] = None
+        self._waiters = []  # [(loop, future)]
+        self.viewers = 0
+        self.frames_sent = 0
+        self.frames_skipped = 0
+
+    def publish(self, jpeg: bytes):
+        """Called from the encode thread with a freshly encoded frame."""
+        with self._lock:
+            self.seq += 1
+            self.frame = jpeg
+            waiters, self._waiters = self._waiters, []
+        for loop, fut in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, fut)
+            except RuntimeError:
+                pass  # loop already closed
+
+    def latest(self) -> Optional[Tuple[int, bytes]]:
+        with self._lock:
+            return (self.seq, self.frame) if self.frame is not None else None
+
+    async def wait_next(self, last_seq: int, timeout: float = 1.0) -> Optional[Tuple[int, bytes]]:
+        """Return (seq, jpeg) newer than last_seq, waiting up to `timeout` seconds for one."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.frame is not None and self.seq > last_seq:
+                return self.seq, self.frame
+            fut = loop.create_future()
+            self._waiters.append((loop, fut))
+
+        try:
+            await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._waiters = [w for w in self._waiters if w[1] is not fut]
+            return None
+        return self.latest()
+
+    def record_sent(self, prev_seq: int, seq: int):
+        """Bookkeeping for one delivered frame; anything between prev_seq and seq was skipped."""
+        with self._lock:
+            self.frames_sent += 1
+            if prev_seq:
+                self.frames_skipped += max(0, seq - prev_seq - 1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "seq": self.seq,
+                "viewers": self.viewers,
+                "frames_sent": self.frames_sent,
+                "frames_skipped": self.frames_skipped,
+            }
+
+    def add_viewer(self, delta: int):
+        with self._lock:
+            self.viewers += delta
+
+
+def _resolve(fut: asyncio.Future):
+    if not fut.done():
+        fut.set_result(None)
+
+
+async def mjpeg_frames(stream_manager, camera_id: Optional[str] = None):
+    """
+    Async MJPEG generator for one camera. Follows the camera across restarts
+    and never blocks the event loop.
+    """
+    broadcaster = None
+    last_seq = 0
+
+    try:
+        while True:
+            cam = stream_manager.get_stream(camera_id)
+            current = cam.broadcaster if cam else None
+
+            if current is not broadcaster:
+                # Camera (re)started or stopped: move our viewer registration along
+                if broadcaster is not None:
+                    broadcaster.add_viewer(-1)
+                broadcaster, last_seq = current, 0
+                if broadcaster is not None:
+                    broadcaster.add_viewer(1)
+
+            if broadcaster is None:
+                await asyncio.sleep(0.1)
+                continue
+
+            item = await broadcaster.wait_next(last_seq, timeout=1.0)
+            if item is None:
+                continue
+
+            seq, frame_bytes = item
+            broadcaster.record_sent(last_seq, seq)
+            last_seq = seq
+            # MJPEG format: multipart/x-mixed-replace with boundary
+            yield (
+                b'--frame\r\n'
+                b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n'
+            )
+    finally:
+        if broadcaster is not None:
+            broadcaster.add_viewer(-1)
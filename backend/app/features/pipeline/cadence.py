@@ -0,0 +1,126 @@
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from app.core.config import get_settings
+
+
+class ModelCadence:
+    """
+    Per-model inference rates for the scheduler.
+
+    Every model has a target rate (MODEL_TARGET_HZ, 0 = every frame) and a
+    priority (MODEL_PRIORITIES, higher = more important). A model is due for
+    a camera once 1/rate seconds have passed since it last ran there; until
+    then its last result is carried forward.
+
+    The scheduler reports how busy each cycle was. When the share of time
+    spent inferring exceeds INFERENCE_CPU_BUDGET, the lowest-priority model
+    still running at full speed has its rate halved (down to
+    INFERENCE_MIN_RATE_SCALE); once there is headroom again, rates are
+    restored highest priority first.
+    """
+
+    ADJUST_INTERVAL = 1.0  # seconds between degrade / restore steps
+
+    def __init__(self):
+        settings = get_settings()
+        self.target_hz = settings.MODEL_TARGET_HZ
+        self.priorities = settings.MODEL_PRIORITIES
+        self.budget = settings.INFERENCE_CPU_BUDGET
+        self.min_scale = settings.INFERENCE_MIN_RATE_SCALE
+
+        self.scale: Dict[str, float] = {}
+        self._last_run: Dict[Tuple[str, str], float] = {}
+        self._last_result: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+
+        self.utilization = 0.0  # EMA of busy time / wall time
+        self.cycle_period = 0.0  # EMA of seconds between scheduler cycles
+        self._prev_cycle: Optional[float] = None
+        self._last_adjust = 0.0
+
+    # ---------- Rates ----------
+    def hz(self, model: str) -> float:
+        return float(self.target_hz.get(model, self.target_hz.get("default", 0)))
+
+    def priority(self, model: str) -> int:
+        return int(self.priorities.get(model, self.priorities.get("default", 0)))
+
+    def interval(self, model: str) -> float:
+        """Minimum seconds between runs of `model` on one camera, after degradation."""
+        scale = self.scale.get(model, 1.0)
+        hz = self.hz(model)
+        if hz > 0:
+            return 1.0 / (hz * scale)
+        # "Every frame" models degrade by skipping cycles
+        return self.cycle_period / scale if scale < 1.0 else 0.0
+
+    def is_due(self, camera_id: str, model: str, now: float) -> bool:
+        last = self._last_run.get((camera_id, model))
+        if last is None:
+            return True
+        slack = min(0.005, self.cycle_period / 2)  # don't miss a slot by a hair
+        return now - last >= self.interval(model) - slack
+
+    # ---------- Results ----------
+    def record(self, camera_id: str, model: str, now: float, result: Any):
+        with self._lock:
+            self._last_run[(camera_id, model)] = now
+            self._last_result[(camera_id, model)] = result
+            self.scale.setdefault(model, 1.0)
+
+    def last_result(self, camera_id: str, model: str) -> Any:
+        return self._last_result.get((camera_id, model))
+
+    def forget(self, camera_id: str, model: Optional[str] = None):
+        """Drop carried results of a camera (e.g. after it stopped), or of one model on it."""
+        with self._lock:
+            for key in [k for k in self._last_result if k[0] == camera_id and model in (None, k[1])]:
+                self._last_result.pop(key, None)
+                self._last_run.pop(key, None)
+
+    # ---------- Budget ----------
+    def observe(self, busy: float, cycle_start: float):
+        """Feed one scheduler cycle (busy seconds, start time) and adapt rates if over/under budget."""
+        if self._prev_cycle is not None:
+            period = max(cycle_start - self._prev_cycle, busy, 1e-3)
+            self.cycle_period = period if not self.cycle_period else 0.9 * self.cycle_period + 0.1 * period
+            self.utilization = 0.9 * self.utilization + 0.1 * min(1.0, busy / period)
+        self._prev_cycle = cycle_start
+
+        now = time.time()
+        if now - self._last_adjust < self.ADJUST_INTERVAL:
+            return
+        self._last_adjust = now
+
+        with self._lock:
+            if self.utilization > self.budget:
+                candidates = [m for m, s in self.scale.items() if s > self.min_scale]
+                if candidates:
+                    victim = min(candidates, key=self.priority)
+                    self.scale[victim] = max(self.min_scale, self.scale[victim] / 2)
+                    print(f"[SCHED] ⚠️ Over CPU budget ({self.utilization:.0%}) — {victim} slowed to x{self.scale[victim]:.2f}")
+            elif self.utilization < self.budget * 0.6:
+                degraded = [m for m, s in self.scale.items() if s < 1.0]
+                if degraded:
+                    model = max(degraded, key=self.priority)
+                    self.scale[model] = min(1.0, self.scale[model] * 2)
+                    print(f"[SCHED] ✅ CPU headroom ({self.utilization:.0%}) — {model} back to x{self.scale[model]:.2f}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = {
+                m: {
+                    "priority": self.priority(m),
+                    "target_hz": self.hz(m),
+                    "rate_scale": round(s, 3),
+                    "min_interval_ms": round(self.interval(m) * 1000, 1),
+                }
+                for m, s in self.scale.items()
+            }
+        return {
+            "utilization": round(self.utilization, 3),
+            "budget": self.budget,
+            "cycle_period_ms": round(self.cycle_period * 1000, 2),
+            "models": models,
+        }
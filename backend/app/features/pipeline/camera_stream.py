@@ -0,0 +1,398 @@
+import cv2
+import datetime
+import numpy as np
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+from app.features.alerts.dispatcher import get_alert_dispatcher
+from app.services.anomalies_svc import submit_anomaly_svc
+from app.features.pipeline.frame_queue import DropOldestQueue, FramePacket
+from app.features.pipeline.broadcaster import FrameBroadcaster
+from app.features.pipeline.clip_recorder import ClipBuffer, get_clip_recorder
+from app.features.pipeline.motion_gate import MotionGate
+from app.features.pipeline.renderer import Layer, get_renderer
+from app.features.pipeline.tracker import TrackerSet
+from app.core.config import get_settings
+
+
+class CameraStream:
+    """
+    One live camera, split into stages connected by drop-oldest queues:
+
+        capture (grab/retrieve, motion gate) -> frame_slot -> [InferenceScheduler]
+            -> result_queue -> annotate (thresholds, tracking, alerts, drawing)
+            -> encode_queue -> encode (JPEG, once) -> FrameBroadcaster -> viewers
+
+    Every queue keeps only the newest items, so a slow stage drops frames
+    (counted per stage) instead of building up latency. Frames the motion
+    gate considers unchanged, or that fall between keyframes, skip inference;
+    their boxes are propagated along the object tracks. While a keyframe is
+    still in the scheduler, such frames are held back and released right
+    after it, so every later stage sees frames in capture order.
+    """
+
+    def __init__(self, camera_info: Dict[str, Any], manager):
+        self.camera_info = camera_info
+        self.camera_id = str(camera_info.get("id") or camera_info.get("_id"))
+        self.manager = manager
+        self.settings = get_settings()
+
+        self.source = 0 if camera_info.get("source") == "laptop_cam" else camera_info.get("rtsp_url")
+        self.cap = None
+        self.active = False
+        self.threads: List[threading.Thread] = []
+
+        # ✅ Stage queues (bounded, drop-oldest)
+        self.frame_slot = DropOldestQueue(maxsize=1)  # capture -> inference
+        self.result_queue = DropOldestQueue(maxsize=self.settings.PIPELINE_RESULT_QUEUE_SIZE)  # inference -> annotate
+        self.encode_queue = DropOldestQueue(maxsize=1)  # annotate -> encode
+
+        # ✅ Motion gate: static frames skip inference, with periodic keyframes as a safety net
+        regions = camera_info.get("motion_regions") or self.settings.MOTION_REGIONS.get(self.camera_id)
+        self.motion = MotionGate(regions=regions)
+        self._last_results: Optional[Dict[str, Any]] = None
+        self._order_lock = threading.Lock()
+        self._pending_seq = 0  # newest keyframe handed to the scheduler whose results are not back yet
+        self._held: deque = deque(maxlen=max(1, self.settings.PIPELINE_RESULT_QUEUE_SIZE))  # skipped frames waiting for it
+        self.roi_regions = camera_info.get("roi_regions") or self.settings.INFERENCE_ROI_REGIONS.get(self.camera_id)
+
+        self.latest_frame = None  # ✅ Latest annotated frame (BGR)
+        self.broadcaster = FrameBroadcaster()  # ✅ Encoded once, shared by all viewers
+        self.clip_buffer = ClipBuffer(int(self.settings.CLIP_BUFFER_MB * 1024 * 1024))  # ✅ Pre/post-event clips
+        self._frame_lock = threading.Lock()
+
+        # ✅ Per-model object tracks: persistence and alert cooldown are kept per track id
+        self.trackers = TrackerSet()
+        self._tracked: Dict[str, Any] = {}  # model -> last result fed to its tracker
+
+        self.stats = {
+            "started_at": None,
+            "frames_grabbed": 0,
+            "frames_captured": 0,
+            "frames_processed": 0,
+            "frames_gated": 0,
+            "frames_propagated": 0,
+            "frames_held_dropped": 0,
+            "frames_unrendered": 0,
+            "frames_encoded": 0,
+            "read_failures": 0,
+            "reconnects": 0,
+            "last_frame_at": None,
+            "fps": 0.0,
+            "latency_ms": {"inference": 0.0, "annotated": 0.0, "encoded": 0.0},
+        }
+
+    # ---------- Lifecycle ----------
+    def start(self) -> bool:
+        print(f"[INFO] Starting camera: {self.camera_info.get('name')} ({self.camera_info.get('location')})")
+
+        self.cap = cv2.VideoCapture(self.source)
+        if not self.cap.isOpened():
+            print(f"[ERROR] ❌ Unable to open camera source for {self.camera_id}.")
+            self.cap.release()
+            self.cap = None
+            return False
+
+        self.active = True
+        self.stats["started_at"] = time.time()
+        self.threads = [
+            threading.Thread(target=self._capture_loop, name=f"capture-{self.camera_id}", daemon=True),
+            threading.Thread(target=self._annotate_loop, name=f"annotate-{self.camera_id}", daemon=True),
+            threading.Thread(target=self._encode_loop, name=f"encode-{self.camera_id}", daemon=True),
+        ]
+        for t in self.threads:
+            t.start()
+        print(f"[INFO] 🚀 Pipeline stages started for camera {self.camera_id}.")
+        return True
+
+    def stop(self):
+        print(f"[INFO] 🛑 Stopping camera stream {self.camera_id}...")
+        self.active = False
+
+        for t in self.threads:
+            if t.is_alive() and t is not threading.current_thread():
+                t.join(timeout=2)
+
+        if self.cap:
+            self.cap.release()
+            self.cap = None
+
+        for q in (self.frame_slot, self.result_queue, self.encode_queue):
+            q.clear()
+        with self._order_lock:
+            self._held.clear()
+            self._pending_seq = 0
+        print(f"[INFO] ✅ Camera stream {self.camera_id} stopped.")
+
+    @property
+    def is_running(self) -> bool:
+        return self.active and bool(self.threads) and self.threads[0].is_alive()
+
+    # ---------- Frames ----------
+    def get_latest_frame(self):
+        """
+        Return latest annotated frame as JPEG bytes for web streaming.
+        Returns None if no frame is available.
+        """
+        latest = self.broadcaster.latest()
+        return latest[1] if latest else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["latency_ms"] = dict(self.stats["latency_ms"])
+        stats["stages"] = {
+            "capture": self.frame_slot.stats(),
+            "inference": self.result_queue.stats(),
+            "annotate": self.encode_queue.stats(),
+            "broadcast": self.broadcaster.stats(),
+        }
+        stats["motion"] = self.motion.get_stats()
+        stats["tracks"] = self.trackers.get_stats()
+        stats["clip_buffer"] = self.clip_buffer.stats()
+        return stats
+
+    # ---------- Stage 1: capture ----------
+    def _capture_loop(self):
+        """Keep only the newest frame: grab() every frame to drain the buffer, retrieve() every Nth."""
+        seq = 0
+        stride = max(1, self.settings.CAPTURE_VID_STRIDE)
+        window_start = time.time()
+        window_frames = 0
+
+        while self.active and self.cap and self.cap.isOpened():
+            if not self.cap.grab():
+                self.stats["read_failures"] += 1
+                print(f"[WARN] ⚠️ Failed to read frame from camera {self.camera_id}.")
+                if not self._reconnect():
+                    break
+                continue
+
+            self.stats["frames_grabbed"] += 1
+            if self.stats["frames_grabbed"] % stride:
+                continue
+
+            ret, frame_bgr = self.cap.retrieve()
+            if not ret or frame_bgr is None:
+                self.stats["read_failures"] += 1
+                if not self._reconnect():
+                    break
+                continue
+
+            seq += 1
+            now = time.time()
+            packet = FramePacket(self.camera_id, seq, frame_bgr, now)
+            if self.motion.check(frame_bgr) or self._last_results is None:
+                with self._order_lock:
+                    self._pending_seq = seq
+                self.frame_slot.put(packet)
+                self.manager.scheduler.notify()
+            else:
+                # Nothing changed or between keyframes: skip inference, annotate stage propagates tracks
+                self._skip_inference(packet)
+                self.stats["frames_gated"] += 1
+            self.stats["frames_captured"] += 1
+            self.stats["last_frame_at"] = now
+
+            window_frames += 1
+            if now - window_start >= 1.0:
+                self.stats["fps"] = round(window_frames / (now - window_start), 2)
+                window_start, window_frames = now, 0
+
+        self.active = False
+        print(f"[INFO] Capture loop exiting for camera {self.camera_id}.")
+
+    def _skip_inference(self, packet: FramePacket):
+        """Send a frame straight to annotate, or hold it until the keyframe in flight has gone ahead."""
+        with self._order_lock:
+            if not self._pending_seq:
+                self.result_queue.put((packet, self._last_results))
+                return
+            if len(self._held) == self._held.maxlen:
+                self.stats["frames_held_dropped"] += 1
+            self._held.append(packet)
+
+    def _reconnect(self) -> bool:
+        """Re-open a network stream after signal loss. Local webcams are not retried."""
+        if not self.active or self.source == 0:
+            return False
+        print(f"[WARN] 🔌 Video stream unresponsive, re-opening camera {self.camera_id}...")
+        self.stats["reconnects"] += 1
+        time.sleep(1.0)
+        self.cap.open(self.source)
+        return self.cap.isOpened()
+
+    # ---------- Stage 2: inference (InferenceScheduler) ----------
+    def on_inference(self, packet: FramePacket, results: Dict[str, Any]):
+        """Called from the scheduler thread; hands results to the annotate stage without blocking."""
+        self.stats["latency_ms"]["inference"] = round((time.time() - packet.captured_at) * 1000, 1)
+        with self._order_lock:
+            self._last_results = results
+            self.result_queue.put((packet, results))
+            if packet.seq >= self._pending_seq:
+                self._pending_seq = 0
+            # ✅ Release held frames up to the next keyframe still in flight, in capture order
+            while self._held and (not self._pending_seq or self._held[0].seq < self._pending_seq):
+                held = self._held.popleft()
+                if held.seq > packet.seq:
+                    self.result_queue.put((held, results))
+                else:
+                    self.stats["frames_held_dropped"] += 1  # older than this keyframe: would run backwards
+
+    # ---------- Stage 3: annotate ----------
+    def _annotate_loop(self):
+        while self.active:
+            item = self.result_queue.get(timeout=0.5)
+            if item is None:
+                continue
+            packet, results = item
+            try:
+                self.handle_results(packet.frame, results, packet.captured_at)
+            except Exception as e:
+                print(f"[ERROR] Post-processing failed for camera {self.camera_id}: {e}")
+                continue
+            self.stats["latency_ms"]["annotated"] = round((time.time() - packet.captured_at) * 1000, 1)
+            self.encode_queue.put(packet)
+
+    def handle_results(self, frame_bgr, results: Dict[str, Any], captured_at: Optional[float] = None):
+        """
+        Update the per-model trackers, raise alerts and draw the frame (only if someone will see it).
+        Tracks and persistence run on the frame's capture time, not on when it reaches this stage.
+        """
+        alerts = []
+        layers = []
+        propagated = False
+        now = captured_at if captured_at is not None else time.time()
+
+        # ✅ Use dynamic threshold from settings
+        current_settings = get_settings()
+
+        for model_name, result in results.items():
+            try:
+                # 1️⃣ Alert Threshold (High confidence needed)
+                alert_threshold = current_settings.MODEL_THRESHOLDS.get(model_name, current_settings.MODEL_THRESHOLDS["default"])
+
+                # 2️⃣ Display Threshold (Lower confidence okay for visual)
+                display_threshold = current_settings.DISPLAY_THRESHOLDS.get(model_name, current_settings.DISPLAY_THRESHOLDS["default"])
+
+                # ✅ Only process/draw if confidence is above DISPLAY threshold (vectorized)
+                dets = result.numpy()[0]
+                dets = dets[dets["conf"] > display_threshold]
+
+                # ✅ Fresh results update the tracker; carried-forward ones (cadence, motion gate, between
+                # keyframes) are drawn from the tracks, moved to this frame's time by the Kalman filter
+                tracker = self.trackers.get(model_name)
+                if self._tracked.get(model_name) is not result:
+                    self._tracked[model_name] = result
+                    track_ids, ended = tracker.update(dets, now)
+                    self._log_ended(model_name, result.names, ended, now)
+                    alerts += self._check_tracks(model_name, result.names, tracker, alert_threshold, current_settings, now)
+                    layers.append(Layer.from_dets(model_name, result.names, dets, track_ids.tolist()))
+                else:
+                    tracker.predict(now)
+                    tracks = tracker.visible_tracks()
+                    boxes = np.array([t.xyxy for t in tracks]).reshape(-1, 4)
+                    layers.append(Layer(model_name, result.names, boxes, [t.conf for t in tracks],
+                                        [t.cls for t in tracks], [t.id for t in tracks]))
+                    propagated = True
+
+            except Exception as e:
+                print(f"[ERROR] Detection error in {model_name}: {e}")
+
+        # 🎨 One render pass for all models; skipped when nobody watches and no alert needs a snapshot
+        if self.broadcaster.viewers or alerts:
+            get_renderer().render(frame_bgr, layers)
+        else:
+            self.stats["frames_unrendered"] += 1
+
+        # 🚨 Alerts go out with the fully annotated frame
+        for anomaly in alerts:
+            self._raise_alert(anomaly, frame_bgr)
+
+        with self._frame_lock:
+            self.latest_frame = frame_bgr
+        self.stats["frames_processed"] += 1
+        if propagated:
+            self.stats["frames_propagated"] += 1
+
+    def _check_tracks(self, model_name: str, names, tracker, alert_threshold: float, current_settings, now: float) -> List[Dict[str, Any]]:
+        """
+        Persistence per track: a track alerts once it has been above the alert threshold
+        for DETECTION_PERSISTENCE_SECONDS, then at most every TRACK_ALERT_COOLDOWN_SECONDS.
+        Persistence restarts once the track has been below the threshold (or lost) for
+        longer than TRACK_ALERT_GRACE_SECONDS.
+        """
+        persistence_seconds = getattr(current_settings, "DETECTION_PERSISTENCE_SECONDS", 3.0)
+        live = {t.id for t in tracker.live_tracks()}
+        anomalies = []
+        for track in tracker.tracks:
+            if track.id not in live or track.conf <= alert_threshold:
+                if track.alert_since is not None:
+                    if track.below_since is None:
+                        track.below_since = now
+                    elif now - track.below_since > current_settings.TRACK_ALERT_GRACE_SECONDS:
+                        track.alert_since = track.below_since = None
+                continue
+            track.below_since = None
+            label = names[track.cls]
+            if track.alert_since is None:
+                track.alert_since = now
+                print(f"[TRACK] ⏳ Tracking {label} #{track.id} on camera {self.camera_id}...")
+
+            duration = now - track.alert_since
+            if duration < persistence_seconds:
+                continue
+            if track.last_alert is not None and now - track.last_alert < current_settings.TRACK_ALERT_COOLDOWN_SECONDS:
+                continue
+            track.last_alert = now
+
+            print(f"[ALERT] 🚨 {label} #{track.id} detected ({track.conf:.2f}) via {model_name} on camera {self.camera_id} (Duration: {duration:.1f}s)")
+            anomalies.append({
+                "model": model_name,
+                "label": label,
+                "confidence": track.conf,
+                "track_id": track.id,
+                "camera_id": self.camera_id,
+                "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            })
+        return anomalies
+
+    def _log_ended(self, model_name: str, names, ended, now: float):
+        # Only tracks that reached the alert threshold are worth a log line
+        for track in ended:
+            if track.alert_since is not None:
+                print(f"[TRACK] 🔄 {names[track.cls]} #{track.id} ({model_name}) lost on camera {self.camera_id} after {now - track.alert_since:.1f}s")
+
+    def _raise_alert(self, anomaly: Dict[str, Any], frame_bgr):
+        if not self.camera_info or not isinstance(self.camera_info, dict):
+            print("[WARN] ⚠️ Camera info not set yet — skipping alert save.")
+            return
+
+        # 🎞️ Clip of the seconds before and after; the anomaly doc links it by clip id
+        anomaly["clip_id"] = get_clip_recorder().request(self.clip_buffer, anomaly, self.camera_info)
+
+        # ✅ Telegram alert is coalesced and sent by the dispatcher thread
+        get_alert_dispatcher().submit(anomaly, frame_bgr, self.camera_info)
+
+        # ✅ Always attempt to save anomaly (queued, never blocks this thread)
+        submit_anomaly_svc(anomaly, frame_bgr, self.camera_info)
+
+    # ---------- Stage 4: encode ----------
+    def _encode_loop(self):
+        quality = [cv2.IMWRITE_JPEG_QUALITY, 85]
+        while self.active:
+            packet = self.encode_queue.get_latest(timeout=0.5)
+            if packet is None:
+                continue
+            try:
+                ok, buffer = cv2.imencode('.jpg', packet.frame, quality)
+            except Exception as e:
+                print(f"[ERROR] Failed to encode frame: {e}")
+                continue
+            if not ok:
+                continue
+            jpeg = buffer.tobytes()
+            self.broadcaster.publish(jpeg)
+            self.clip_buffer.push(packet.captured_at, jpeg)
+            self.stats["frames_encoded"] += 1
+            self.stats["latency_ms"]["encoded"] = round((time.time() - packet.captured_at) * 1000, 1)
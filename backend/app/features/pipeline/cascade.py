@@ -0,0 +1,89 @@
+import threading
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.core.config import get_settings
+from app.features.yolo.crops import expand_boxes
+
+
+class ModelCascade:
+    """
+    Declarative model cascade (MODEL_CASCADE).
+
+    A rule like {"weapon": {"requires": "people", "min_conf": 0.5,
+    "window_frames": 15}} only lets `weapon` run on a camera if `people`
+    found something with at least `min_conf` within that camera's last
+    `window_frames` inferred frames. With "roi_crops": true the specialist
+    also runs on padded crops around those detections instead of the full
+    frame. Trigger models run before the models that depend on them; if a
+    trigger is not running at all, its specialists are not held back.
+    """
+
+    def __init__(self, rules: Optional[Dict[str, Dict[str, Any]]] = None):
+        settings = get_settings()
+        self.rules = {m: r for m, r in (rules if rules is not None else settings.MODEL_CASCADE).items() if r.get("requires")}
+        self.triggers = {r["requires"] for r in self.rules.values()}
+        self.window = max([int(r.get("window_frames", 1)) for r in self.rules.values()] or [1])
+
+        self._frame: Dict[str, int] = defaultdict(int)  # camera -> inferred frames so far
+        self._history: Dict[Tuple[str, str], deque] = {}  # (camera, trigger) -> (frame no, confs, boxes)
+        self._lock = threading.Lock()
+        self.stats = defaultdict(lambda: {"ran": 0, "skipped": 0, "crops": 0})
+
+    # ---------- Order / bookkeeping ----------
+    def order(self, models: List[str]) -> List[str]:
+        """Trigger models first, so their fresh results gate this cycle's specialists."""
+        return sorted(models, key=lambda m: m not in self.triggers)
+
+    def tick(self, camera_id: str):
+        """A new frame of `camera_id` is being inferred."""
+        self._frame[camera_id] += 1
+
+    def observe(self, camera_id: str, model: str, det):
+        """Remember a fresh result of a trigger model."""
+        if model not in self.triggers or det is None:
+            return
+        dets = det.numpy()[0]
+        with self._lock:
+            hist = self._history.setdefault((camera_id, model), deque(maxlen=self.window))
+            hist.append((self._frame[camera_id], dets["conf"].copy(), dets["xyxy"].copy()))
+
+    def forget(self, camera_id: str):
+        with self._lock:
+            for key in [k for k in self._history if k[0] == camera_id]:
+                del self._history[key]
+            self._frame.pop(camera_id, None)
+
+    # ---------- Gating ----------
+    def _recent(self, camera_id: str, model: str) -> List[np.ndarray]:
+        """Trigger boxes (per frame, newest first) that satisfy `model`'s rule on this camera."""
+        rule = self.rules[model]
+        min_conf = float(rule.get("min_conf", 0.5))
+        oldest = self._frame[camera_id] - int(rule.get("window_frames", 1))
+        with self._lock:
+            hist = list(self._history.get((camera_id, rule["requires"]), ()))
+        return [boxes[conf >= min_conf] for frame_no, conf, boxes in reversed(hist)
+                if frame_no > oldest and (conf >= min_conf).any()]
+
+    def allows(self, camera_id: str, model: str, running=None) -> bool:
+        """True if `model` may run on this camera. `running`: models currently active and loaded."""
+        if model not in self.rules or (running is not None and self.rules[model]["requires"] not in running):
+            return True
+        ok = bool(self._recent(camera_id, model))
+        self.stats[model]["ran" if ok else "skipped"] += 1
+        return ok
+
+    def rois(self, camera_id: str, model: str, shape) -> Optional[np.ndarray]:
+        """Crop boxes for `model` on this camera, or None to run on the full frame."""
+        rule = self.rules.get(model)
+        if not rule or not rule.get("roi_crops"):
+            return None
+        recent = self._recent(camera_id, model)
+        if not recent:
+            return None
+        rois = expand_boxes(recent[0], shape, pad=float(rule.get("roi_pad", 0.25)), min_size=int(rule.get("roi_min_size", 64)))
+        self.stats[model]["crops"] += len(rois)
+        return rois
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"rules": self.rules, "models": {m: dict(s) for m, s in self.stats.items()}}
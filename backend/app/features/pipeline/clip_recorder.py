@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+from app.core.config import get_settings
+from app.repositories import anomalies_repo
+
+
+class ClipBuffer:
+    """
+    Per-camera ring buffer of the JPEG frames the encode stage already
+    produces, bounded by bytes rather than frame count: the oldest frames
+    fall out once CLIP_BUFFER_MB is exceeded. push() is O(1) so the encode
+    thread never waits on recording.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.frames: deque = deque()  # (timestamp, jpeg bytes)
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def push(self, ts: float, jpeg: bytes):
+        with self._lock:
+            self.frames.append((ts, jpeg))
+            self.bytes += len(jpeg)
+            while self.bytes > self.max_bytes and len(self.frames) > 1:
+                _, old = self.frames.popleft()
+                self.bytes -= len(old)
+
+    def window(self, start: float, end: float) -> List[Tuple[float, bytes]]:
+        with self._lock:
+            return [(ts, f) for ts, f in self.frames if start <= ts <= end]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            span = self.frames[-1][0] - self.frames[0][0] if len(self.frames) > 1 else 0.0
+            return {"frames": len(self.frames), "bytes": self.bytes, "seconds": round(span, 2)}
+
+
+class ClipRecorder:
+    """
+    Writes pre/post-event MP4 clips for alerts.
+
+    request() is called on the annotate thread when an alert fires: it grabs
+    the pre-event frames from the camera's ClipBuffer right away (references
+    only, so nothing is evicted before it is written), returns a clip id for
+    the anomaly document and schedules the rest. Once the post-event time
+    has passed, a writer-pool thread collects the following frames, decodes
+    and writes the MP4, uploads it and links it to the anomaly by clip id.
+    Capture and inference never wait on any of it.
+    """
+
+    LINK_ATTEMPTS = 5  # the anomaly doc may still be in the writer's batch when the clip is done
+
+    def __init__(self):
+        settings = get_settings()
+        self.enabled = settings.CLIP_RECORDING_ENABLED
+        self.pre = settings.CLIP_PRE_SECONDS
+        self.post = settings.CLIP_POST_SECONDS
+        self.upload = settings.CLIP_UPLOAD
+        self.root = Path(settings.CLIP_DIR or "clips")
+        self.pool = ThreadPoolExecutor(max_workers=max(1, settings.CLIP_WRITER_WORKERS), thread_name_prefix="clip-writer")
+        self._timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+        self.stats = {"requested": 0, "written": 0, "uploaded": 0, "linked": 0, "failed": 0, "pending": 0}
+
+    def request(self, buffer: Optional[ClipBuffer], anomaly: Dict[str, Any], camera: Dict[str, Any]) -> Optional[str]:
+        """Start a clip around now for `anomaly`; returns its clip id (None if recording is off)."""
+        if not self.enabled or buffer is None:
+            return None
+        now = time.time()
+        clip_id = uuid.uuid4().hex
+        pre_frames = buffer.window(now - self.pre, now)
+
+        timer = threading.Timer(self.post, self._submit, args=(clip_id, buffer, pre_frames, now, dict(anomaly), dict(camera)))
+        timer.daemon = True
+        with self._lock:
+            self._timers[clip_id] = timer
+            self.stats["requested"] += 1
+            self.stats["pending"] += 1
+        timer.start()
+        return clip_id
+
+    def stop(self):
+        with self._lock:
+            timers, self._timers = list(self._timers.values()), {}
+        for t in timers:
+            t.cancel()
+        self.pool.shutdown(wait=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats)
+
+    # ---------- Writer pool ----------
+    def _submit(self, clip_id: str, buffer: ClipBuffer, pre_frames, t_event: float, anomaly, camera):
+        with self._lock:
+            self._timers.pop(clip_id, None)
+        last = pre_frames[-1][0] if pre_frames else t_event - self.pre
+        frames = pre_frames + [f for f in buffer.window(t_event, t_event + self.post) if f[0] > last]
+        try:
+            self.pool.submit(self._write, clip_id, frames, anomaly, camera)
+        except RuntimeError:  # pool already shut down
+            self._done("failed")
+
+    def _write(self, clip_id: str, frames: List[Tuple[float, bytes]], anomaly: Dict[str, Any], camera: Dict[str, Any]):
+        try:
+            if len(frames) < 2:
+                raise ValueError("not enough buffered frames")
+            path = self._encode(clip_id, frames, camera)
+            self._bump("written")
+            print(f"[CLIP] 🎞️ Wrote {path.name} ({len(frames)} frames) for {anomaly.get('label')}")
+        except Exception as e:
+            print(f"[CLIP] ❌ Clip {clip_id[:8]} failed: {e}")
+            self._done("failed")
+            return
+
+        fields = {"clip_status": "local", "clip_path": str(path)}
+        if self.upload:
+            try:
+                fields["clip_url"] = anomalies_repo.upload_anomaly_clip_sync(path, anomaly, camera)
+                fields["clip_status"] = "ready"
+                self._bump("uploaded")
+            except Exception as e:
+                print(f"[CLIP] ⚠️ Upload failed, keeping local clip: {e}")
+
+        for attempt in range(self.LINK_ATTEMPTS):
+            try:
+                if anomalies_repo.set_anomaly_clip_sync(clip_id, fields):
+                    self._done("linked")
+                    return
+            except Exception as e:
+                print(f"[CLIP] ⚠️ Linking clip {clip_id[:8]} failed: {e}")
+            time.sleep(2.0 * (attempt + 1))
+        print(f"[CLIP] ⚠️ No anomaly document found for clip {clip_id[:8]}")
+        self._done("failed")
+
+    def _encode(self, clip_id: str, frames: List[Tuple[float, bytes]], camera: Dict[str, Any]) -> Path:
+        first = cv2.imdecode(np.frombuffer(frames[0][1], np.uint8), cv2.IMREAD_COLOR)
+        h, w = first.shape[:2]
+        fps = max(1.0, (len(frames) - 1) / max(frames[-1][0] - frames[0][0], 1e-3))  # real capture rate
+
+        out_dir = self.root / str(camera.get("id", "camera"))
+        out_dir.mkdir(parents=True, exist_ok=True)
+        path = out_dir / f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(frames[0][0]))}_{clip_id[:8]}.mp4"
+        tmp = path.with_name(f".{path.name}.tmp.mp4")
+
+        writer = cv2.VideoWriter(str(tmp), cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+        if not writer.isOpened():
+            raise RuntimeError("VideoWriter could not be opened")
+        try:
+            for _, jpeg in frames:
+                frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+                if frame is None:
+                    continue
+                if frame.shape[:2] != (h, w):  # resolution changed mid-clip (reconnect)
+                    frame = cv2.resize(frame, (w, h))
+                writer.write(frame)
+        finally:
+            writer.release()
+        os.replace(tmp, path)  # ✅ never link a half-written file
+        return path
+
+    def _bump(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _done(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+            self.stats["pending"] -= 1
+
+
+_recorder: Optional[ClipRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_clip_recorder() -> ClipRecorder:
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = ClipRecorder()
+    return _recorder
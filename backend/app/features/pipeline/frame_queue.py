@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+
+class DropOldestQueue:
+    """
+    Small bounded queue for handing frames between threads.
+    When full, the oldest item is discarded so producers never block
+    and consumers always see the freshest data.
+    """
+
+    def __init__(self, maxsize: int = 1):
+        self.maxsize = max(1, int(maxsize))
+        self._items = deque()
+        self._cond = threading.Condition()
+        self.put_count = 0
+        self.dropped = 0
+
+    def put(self, item: Any):
+        """Insert item, discarding the oldest one if the queue is full."""
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self.put_count += 1
+            self._cond.notify_all()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Pop the oldest item, waiting up to `timeout` seconds. Returns None on timeout."""
+        with self._cond:
+            if not self._items and not self._cond.wait_for(lambda: bool(self._items), timeout):
+                return None
+            return self._items.popleft()
+
+    def get_latest(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Pop the newest item and discard anything older (counted as dropped)."""
+        with self._cond:
+            if not self._items and not self._cond.wait_for(lambda: bool(self._items), timeout):
+                return None
+            item = self._items.pop()
+            self.dropped += len(self._items)
+            self._items.clear()
+            return item
+
+    def peek_latest(self) -> Optional[Any]:
+        """Return the newest item without removing it."""
+        with self._cond:
+            return self._items[-1] if self._items else None
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                "depth": len(self._items),
+                "maxsize": self.maxsize,
+                "put": self.put_count,
+                "dropped": self.dropped,
+            }
+
+
+class FramePacket:
+    """A captured frame plus the metadata that travels with it through the pipeline."""
+
+    __slots__ = ("camera_id", "seq", "frame", "captured_at")
+
+    def __init__(self, camera_id: str, seq: int, frame, captured_at: Optional[float] = None):
+        self.camera_id = camera_id
+        self.seq = seq
+        self.frame = frame
+        self.captured_at = captured_at if captured_at is not None else time.time()
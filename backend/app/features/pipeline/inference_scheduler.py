@@ -0,0 +1,284 @@
+import cv2
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+from app.core.config import get_settings
+from app.features.pipeline.cadence import ModelCadence
+from app.features.pipeline.cascade import ModelCascade
+from app.features.yolo.crops import detect_on_crops
+from app.features.yolo.preprocess import FramePreprocessor, detect_prepared, model_input
+from app.features.yolo.tiling import TilePlanner, detect_tiled
+
+
+class InferenceScheduler:
+    """
+    Central inference loop shared by all cameras.
+
+    Gathers the newest frame of every running camera, runs ONE batched
+    forward per active model (AutoShape accepts a list of images) and hands
+    each camera its own results for its annotate stage. A batch is closed as
+    soon as every camera has a frame, `max_batch` is reached or the
+    `max_wait` deadline expires — whichever comes first. With more cameras
+    than `max_batch`, the ones served longest ago go first, so every camera
+    keeps getting inferred under load. Each model only runs
+    at its own target rate (see ModelCadence); in between, its last result
+    is carried forward. Specialist models additionally wait for their
+    trigger model (see ModelCascade), and high-resolution or ROI cameras are
+    inferred tile by tile (see TilePlanner). Full frames are letterboxed
+    once per cycle by the shared FramePreprocessor and that tensor is fed
+    to every model.
+    """
+
+    def __init__(self, manager, max_batch: int = None, max_wait_ms: float = None):
+        settings = get_settings()
+        self.manager = manager
+        self.max_batch = max(1, int(max_batch or settings.INFERENCE_MAX_BATCH))
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.INFERENCE_MAX_WAIT_MS) / 1000.0
+
+        self.cadence = ModelCadence()  # ✅ Per-model target rates, priorities and carry-forward results
+        self.cascade = ModelCascade()  # ✅ Specialists only run where their trigger model fired
+        self.tiles = TilePlanner()  # ✅ Tiled inference for 4K / ROI cameras
+        self.preprocessor = FramePreprocessor()  # ✅ Letterbox once per frame, shared by all models
+        self.active = False
+        self.thread = None
+        self._wake = threading.Event()
+        self._served: Dict[str, float] = {}  # camera_id -> when its last frame went into a batch
+
+        self.stats = {
+            "cycles": 0,
+            "frames": 0,
+            "forwards": 0,
+            "last_batch_size": 0,
+            "last_cycle_ms": 0.0,
+            "model_ms": {},
+        }
+
+    # ---------- Lifecycle ----------
+    def start(self):
+        if self.active:
+            return
+        self.active = True
+        self.thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self.thread.start()
+        print(f"[SCHED] 🚀 Inference scheduler started (max_batch={self.max_batch}, max_wait={self.max_wait * 1000:.0f}ms)")
+
+    def stop(self):
+        self.active = False
+        self._wake.set()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2)
+        print("[SCHED] 🛑 Inference scheduler stopped.")
+
+    def notify(self):
+        """Called by capture threads whenever a new frame lands in a camera slot."""
+        self._wake.set()
+
+    def forget(self, camera_id: str):
+        """Drop per-camera state (carried results, cascade history), e.g. when a camera stops."""
+        self.cadence.forget(camera_id)
+        self.cascade.forget(camera_id)
+        self.tiles.forget(camera_id)
+        self._served.pop(camera_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["model_ms"] = dict(self.stats["model_ms"])
+        stats["cadence"] = self.cadence.get_stats()
+        stats["cascade"] = self.cascade.get_stats()
+        return stats
+
+    # ---------- Loop ----------
+    def _run(self):
+        while self.active:
+            if not self._wake.wait(timeout=0.5):
+                continue
+            self._wake.clear()
+
+            packets = self._collect()
+            if not packets:
+                continue
+
+            t0 = time.time()
+            results = self._infer(packets)
+            self._dispatch(packets, results)
+            busy = time.time() - t0
+            self.cadence.observe(busy, t0)
+
+            self.stats["cycles"] += 1
+            self.stats["frames"] += len(packets)
+            self.stats["last_batch_size"] = len(packets)
+            self.stats["last_cycle_ms"] = round(busy * 1000, 2)
+
+    def _collect(self) -> List[tuple]:
+        """Wait until the batch is full or the deadline passes, then take the newest frame per camera."""
+        deadline = time.time() + self.max_wait
+
+        while True:
+            streams = [c for c in self.manager.list_streams() if c.active]
+            ready = [c for c in streams if len(c.frame_slot)]
+            if not streams:
+                return []
+            if len(ready) >= min(len(streams), self.max_batch) or time.time() >= deadline:
+                break
+            self._wake.wait(timeout=max(0.0, deadline - time.time()))
+            self._wake.clear()
+
+        # ✅ Least recently served first: cameras past the cutoff lead the next batch
+        ready.sort(key=lambda c: self._served.get(c.camera_id, 0.0))
+        now = time.time()
+        packets = []
+        for cam in ready[: self.max_batch]:
+            packet = cam.frame_slot.get_latest(timeout=0)
+            if packet is not None:
+                packets.append((cam, packet))
+                self._served[cam.camera_id] = now
+
+        # Cameras left over because the batch was full get picked up next cycle
+        if len(ready) > self.max_batch:
+            self._wake.set()
+        return packets
+
+    def _infer(self, packets: List[tuple]) -> List[Dict[str, Any]]:
+        """
+        Run one batched forward per active model, only for cameras where that model is due
+        and its cascade trigger (if any) fired recently.
+        Returns per-packet {model_name: Detections}; models that were not due carry their last result forward.
+        """
+        results: List[Dict[str, Any]] = [{} for _ in packets]
+        frames = [p.frame for _, p in packets]  # BGR; the preprocessor swaps channels while normalizing
+        cam_ids = [cam.camera_id for cam, _ in packets]
+        now = time.time()
+        for cam_id in cam_ids:
+            self.cascade.tick(cam_id)
+
+        # ✅ Group by resolution so small frames are not padded up to the largest one
+        groups = defaultdict(list)
+        for i, frame in enumerate(frames):
+            groups[frame.shape[:2]].append(i)
+
+        prepared = {}
+        frames_rgb = {}
+
+        def batch_for(shape, stride: int):
+            """Letterboxed tensor of one resolution group, built on first use and shared by every model."""
+            key = (shape, stride)
+            if key not in prepared:
+                prepared[key] = self.preprocessor.prepare([frames[i] for i in groups[shape]], stride)
+            return prepared[key]
+
+        def rgb(i: int):
+            """Full RGB frame, only for paths that still take images (crops, tiles, non-AutoShape models)."""
+            if i not in frames_rgb:
+                frames_rgb[i] = cv2.cvtColor(frames[i], cv2.COLOR_BGR2RGB)
+            return frames_rgb[i]
+
+        active = self.cascade.order(list(self.manager.active_models))
+        due = {m: [i for i in range(len(packets)) if self.cadence.is_due(cam_ids[i], m, now)] for m in active}
+        running = {m for m in active if m in self.manager.models}
+        blocked = set()  # (packet index, model) held back by the cascade
+
+        def gate(model_name: str) -> List[int]:
+            allowed = []
+            for i in due[model_name]:
+                if self.cascade.allows(cam_ids[i], model_name, running):
+                    allowed.append(i)
+                else:
+                    blocked.add((i, model_name))
+            return allowed
+
+        # 🔗 Shared-backbone mode: backbone/neck once, every due head on top.
+        # Heads run together, so cascaded heads are gated on the trigger's previous results.
+        multihead = getattr(self.manager, "multihead", None)
+        if multihead is not None:
+            head_due = {m: gate(m) for m in active if m in multihead.heads}
+            heads = [m for m, idx in head_due.items() if idx]
+            active = [m for m in active if m not in multihead.heads]
+            if heads:
+                t0 = time.time()
+                try:
+                    for shape, idx in groups.items():
+                        out = multihead.run_prepared(batch_for(shape, multihead.detector.stride), heads=heads)
+                        for model_name, batch in out.items():
+                            for i, det in zip(idx, batch.tolist()):
+                                if i in head_due[model_name]:
+                                    results[i][model_name] = det
+                                    self.cascade.observe(cam_ids[i], model_name, det)
+                        self.stats["forwards"] += 1
+                except Exception as e:
+                    print(f"[ERROR] Shared-backbone detection error: {e}")
+                self.stats["model_ms"]["multihead"] = round((time.time() - t0) * 1000, 2)
+
+        for model_name in active:
+            model = self.manager.get_model(model_name)
+            if not model or not due[model_name]:
+                continue
+            allowed = gate(model_name)
+            if not allowed:
+                continue
+
+            t0 = time.time()
+            try:
+                # 🔍 ROI mode: crops around the trigger's detections, all cameras in one call
+                rois = {i: self.cascade.rois(cam_ids[i], model_name, frames[i].shape) for i in allowed}
+                cropped = [i for i in allowed if rois[i] is not None]
+                if cropped:
+                    dets = detect_on_crops(model, [rgb(i) for i in cropped], [rois[i] for i in cropped])
+                    for i, det in zip(cropped, dets):
+                        results[i][model_name] = det
+                    self.stats["forwards"] += 1
+
+                # 🧩 Tiled mode: every tile of every such camera in one forward
+                device, _, stride = model_input(model)
+                plans = {i: self.tiles.plan(cam_ids[i], model_name, frames[i].shape, packets[i][0].roi_regions, stride)
+                         for i in allowed if rois[i] is None}
+                tiled = [i for i, plan in plans.items() if plan is not None]
+                full = {i for i, plan in plans.items() if plan is None}
+                if tiled:
+                    dets = detect_tiled(model, [rgb(i) for i in tiled], [plans[i] for i in tiled], self.tiles.max_batch)
+                    for i, det in zip(tiled, dets):
+                        results[i][model_name] = det
+                    self.stats["forwards"] += -(-sum(len(plans[i].tiles) for i in tiled) // self.tiles.max_batch)
+
+                for shape, idx in groups.items():
+                    sel = [pos for pos, i in enumerate(idx) if i in full]
+                    if not sel:
+                        continue
+                    if device is None:  # not an AutoShape-wrapped network: let the model preprocess
+                        batch = model([rgb(idx[pos]) for pos in sel])
+                    else:
+                        batch = detect_prepared(model, batch_for(shape, stride).select(sel))
+                    for pos, det in zip(sel, batch.tolist()):
+                        results[idx[pos]][model_name] = det
+                    self.stats["forwards"] += 1
+            except Exception as e:
+                print(f"[ERROR] Batched detection error in {model_name}: {e}")
+            elapsed = time.time() - t0
+            self.stats["model_ms"][model_name] = round(elapsed * 1000, 2)
+
+            for i in allowed:
+                self.cascade.observe(cam_ids[i], model_name, results[i].get(model_name))
+
+        # ✅ Record fresh runs, carry the last result forward for models that were skipped.
+        # A model held back by the cascade gets nothing, so stale detections can't outlive their trigger.
+        for i, res in enumerate(results):
+            for model_name in self.manager.active_models:
+                if model_name in res:
+                    self.cadence.record(cam_ids[i], model_name, now, res[model_name])
+                elif (i, model_name) in blocked:
+                    self.cadence.forget(cam_ids[i], model_name)
+                else:
+                    carried = self.cadence.last_result(cam_ids[i], model_name)
+                    if carried is not None:
+                        res[model_name] = carried
+
+        return results
+
+    def _dispatch(self, packets: List[tuple], results: List[Dict[str, Any]]):
+        for (cam, packet), res in zip(packets, results):
+            if not cam.active:
+                continue
+            try:
+                cam.on_inference(packet, res)
+            except Exception as e:
+                print(f"[ERROR] Failed to hand off results for camera {cam.camera_id}: {e}")
@@ -0,0 +1,127 @@
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import cv2
+import numpy as np
+from app.core.config import get_settings
+
+
+def polygon_mask(shape: Tuple[int, int], polygons: Sequence[Sequence[Sequence[float]]]) -> Optional[np.ndarray]:
+    """
+    Binary mask (uint8, 255 inside) for polygons given in normalized [0, 1] x/y coordinates.
+    Returns None when no polygons are configured (= whole frame).
+    """
+    if not polygons:
+        return None
+    h, w = shape
+    mask = np.zeros((h, w), dtype=np.uint8)
+    pts = [np.round(np.asarray(p, dtype=np.float32) * (w - 1, h - 1)).astype(np.int32) for p in polygons if len(p) >= 3]
+    if not pts:
+        return None
+    cv2.fillPoly(mask, pts, 255)
+    return mask
+
+
+class MotionGate:
+    """
+    Cheap change detector in front of inference.
+
+    Each frame is shrunk to MOTION_DOWNSCALE_WIDTH, converted to blurred
+    grayscale and compared with the frame that was last sent to inference.
+    If the fraction of changed pixels (inside the configured regions) stays
+    below MOTION_MIN_AREA the frame is gated; a keyframe is still let
+    through every MOTION_KEYFRAME_SECONDS so slow changes and stale results
+    cannot persist forever.
+
+    Moving frames are not all inferred either: detection runs every N-th
+    frame, where N shrinks from KEYFRAME_MAX_INTERVAL to
+    KEYFRAME_MIN_INTERVAL as the changed area approaches
+    KEYFRAME_MOTION_HIGH. Frames in between are drawn from tracker
+    propagation.
+    """
+
+    def __init__(self, regions: Optional[List[List[List[float]]]] = None):
+        settings = get_settings()
+        self.enabled = settings.MOTION_GATING_ENABLED
+        self.width = max(32, settings.MOTION_DOWNSCALE_WIDTH)
+        self.pixel_threshold = settings.MOTION_PIXEL_THRESHOLD
+        self.min_area = settings.MOTION_MIN_AREA
+        self.keyframe_interval = settings.MOTION_KEYFRAME_SECONDS
+        self.regions = regions or []
+        self.min_interval = max(1, settings.KEYFRAME_MIN_INTERVAL)
+        self.max_interval = max(self.min_interval, settings.KEYFRAME_MAX_INTERVAL)
+        self.motion_high = max(settings.KEYFRAME_MOTION_HIGH, 1e-6)
+
+        self._reference: Optional[np.ndarray] = None
+        self._mask: Optional[np.ndarray] = None
+        self._mask_pixels = 0
+        self._last_pass = 0.0
+        self._since_pass = 0  # frames checked since the last one that went to inference
+
+        self.stats = {"passed": 0, "gated": 0, "keyframes": 0, "skipped": 0, "last_score": 0.0, "interval": 1}
+
+    def check(self, frame_bgr) -> bool:
+        """Return True if this frame should go to inference."""
+        if not self.enabled:
+            self.stats["passed"] += 1
+            return True
+
+        small = self._prepare(frame_bgr)
+        now = time.time()
+
+        if self._reference is None or self._reference.shape != small.shape:
+            return self._accept(small, now)
+
+        diff = cv2.absdiff(small, self._reference)
+        changed = diff > self.pixel_threshold
+        if self._mask is not None:
+            score = np.count_nonzero(changed & self._mask) / self._mask_pixels
+        else:
+            score = np.count_nonzero(changed) / changed.size
+        self.stats["last_score"] = round(float(score), 4)
+
+        if now - self._last_pass >= self.keyframe_interval:
+            self.stats["keyframes"] += 1
+            return self._accept(small, now)
+        if score >= self.min_area:
+            self._since_pass += 1
+            self.stats["interval"] = interval = self.interval(score)
+            if self._since_pass >= interval:
+                return self._accept(small, now)
+            self.stats["skipped"] += 1  # moving, but between keyframes: tracks carry the boxes
+            return False
+
+        self._since_pass += 1
+        self.stats["gated"] += 1
+        return False
+
+    def interval(self, score: float) -> int:
+        """Frames between detections for a given amount of motion: busy scenes are inferred more often."""
+        ratio = min(1.0, score / self.motion_high)
+        return int(round(self.max_interval - (self.max_interval - self.min_interval) * ratio))
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        total = stats["passed"] + stats["gated"] + stats["skipped"]
+        stats["gated_ratio"] = round((stats["gated"] + stats["skipped"]) / total, 3) if total else 0.0
+        return stats
+
+    def _prepare(self, frame_bgr) -> np.ndarray:
+        h, w = frame_bgr.shape[:2]
+        size = (self.width, max(1, round(h * self.width / w)))
+        small = cv2.resize(frame_bgr, size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)  # ignore sensor noise / compression artifacts
+
+        if self.regions and (self._mask is None or self._mask.shape != gray.shape):
+            mask = polygon_mask(gray.shape, self.regions)
+            self._mask = mask.astype(bool) if mask is not None else None
+            self._mask_pixels = max(1, int(np.count_nonzero(self._mask))) if self._mask is not None else 0
+        return gray
+
+    def _accept(self, small: np.ndarray, now: float) -> bool:
+        # Compare against the last frame that was actually inferred, so slow drift still adds up
+        self._reference = small
+        self._last_pass = now
+        self._since_pass = 0
+        self.stats["passed"] += 1
+        return True
@@ -0,0 +1,140 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence, Tuple
+import cv2
+import numpy as np
+from app.features.yolo.loader import ensure_yolov5_path
+
+ensure_yolov5_path()
+
+from utils.plots import colors as class_colors  # noqa: E402  (Ultralytics palette, shared with yolov5 plots)
+
+# ✅ Base color per model (BGR); further classes of a model take the Ultralytics palette
+MODEL_COLORS = {
+    "people": (0, 255, 0),
+    "weapon": (0, 0, 255),
+    "fire": (0, 165, 255),
+    "shoplifting": (255, 0, 255),
+    "crowd": (255, 140, 0),
+    "Accident": (255, 255, 0),
+    "Vandalism": (0, 255, 255),
+}
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+@dataclass
+class Layer:
+    """Detections of one model on one frame, as parallel arrays."""
+    model: str
+    names: Any  # class index -> label (list or dict, as in Detections.names)
+    boxes: np.ndarray  # (N, 4) xyxy pixels
+    confs: Sequence[float]
+    classes: Sequence[int]
+    track_ids: Optional[Sequence[int]] = None  # -1 = no track
+
+    @classmethod
+    def from_dets(cls, model: str, names, dets: np.ndarray, track_ids=None) -> "Layer":
+        """Layer from a Detections.numpy() structured array."""
+        return cls(model, names, dets["xyxy"], dets["conf"].tolist(), dets["cls"].tolist(), track_ids)
+
+
+class Renderer:
+    """
+    Shared annotation renderer for live streams, uploads and alert snapshots.
+
+    All layers of a frame are merged and drawn in one pass: box coordinates
+    are clipped as one array, every box gets its model's palette color and
+    its label is blitted from an LRU cache of pre-rendered patches (text on a
+    filled background). Class names are cached per (name, color); the track
+    id and confidence, which change all the time, are assembled from cached
+    single-character patches. So putText only runs for glyphs not seen yet,
+    and the cache stays small however many tracks pass by.
+    """
+
+    def __init__(self, thickness: int = 2, font_scale: float = 0.5, cache_size: int = 2048):
+        self.thickness = thickness
+        self.font_scale = font_scale
+        self.cache_size = cache_size
+        self._glyphs: "OrderedDict[Tuple[str, tuple], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        (_, self._text_h), self._text_base = cv2.getTextSize("Ag#0", FONT, font_scale, 1)  # one height for every patch
+
+    def color(self, model: str, cls: int) -> Tuple[int, int, int]:
+        base = MODEL_COLORS.get(model)
+        if base is not None and cls == 0:
+            return base
+        return class_colors(cls + (0 if base is None else 1), bgr=True)
+
+    def render(self, frame_bgr: np.ndarray, layers: List[Layer]) -> np.ndarray:
+        """Draw every layer onto `frame_bgr` in place and return it."""
+        layers = [layer for layer in layers if len(layer.boxes)]
+        if not layers:
+            return frame_bgr
+
+        h, w = frame_bgr.shape[:2]
+        boxes = np.concatenate([np.asarray(layer.boxes, dtype=np.float32).reshape(-1, 4) for layer in layers])
+        boxes = np.round(boxes).astype(np.int32)
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w - 1)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h - 1)
+
+        labels = []
+        for layer in layers:
+            tids = layer.track_ids if layer.track_ids is not None else [-1] * len(layer.boxes)
+            for conf, cls, tid in zip(layer.confs, layer.classes, tids):
+                name = str(layer.names[int(cls)])
+                suffix = f" #{tid} {conf:.2f}" if tid >= 0 else f" {conf:.2f}"
+                labels.append((name, suffix, self.color(layer.model, int(cls))))
+
+        for (x1, y1, x2, y2), (name, suffix, color) in zip(boxes.tolist(), labels):
+            cv2.rectangle(frame_bgr, (x1, y1), (x2, y2), color, self.thickness)
+            pieces = [self._glyph(name, color, pad=2)] + [self._glyph(ch, color) for ch in suffix]
+            self._blit(frame_bgr, pieces, x1, y1)
+        return frame_bgr
+
+    def _glyph(self, text: str, color: Tuple[int, int, int], pad: int = 0) -> np.ndarray:
+        key = (text, color)
+        with self._lock:
+            patch = self._glyphs.get(key)
+            if patch is not None:
+                self._glyphs.move_to_end(key)
+                return patch
+
+        (tw, _), _ = cv2.getTextSize(text, FONT, self.font_scale, 1)
+        patch = np.empty((self._text_h + self._text_base + 4, tw + 2 * pad, 3), dtype=np.uint8)
+        patch[:] = color
+        ink = (0, 0, 0) if sum(color) > 382 else (255, 255, 255)  # readable on light and dark colors
+        cv2.putText(patch, text, (pad, self._text_h + 2), FONT, self.font_scale, ink, 1, cv2.LINE_AA)
+
+        with self._lock:
+            self._glyphs[key] = patch
+            if len(self._glyphs) > self.cache_size:
+                self._glyphs.popitem(last=False)
+        return patch
+
+    @staticmethod
+    def _blit(frame: np.ndarray, pieces: List[np.ndarray], x: int, y: int):
+        """Place label patches side by side above the box corner, or inside the box if they would leave the frame."""
+        ph = pieces[0].shape[0]
+        h, w = frame.shape[:2]
+        top = y - ph if y - ph >= 0 else y
+        bottom = min(top + ph, h)
+        if bottom <= top:
+            return
+        for patch in pieces:
+            right = min(x + patch.shape[1], w)
+            if right <= x:
+                break
+            frame[top:bottom, x:right] = patch[: bottom - top, : right - x]
+            x = right
+
+
+_renderer: Optional[Renderer] = None
+
+
+def get_renderer() -> Renderer:
+    global _renderer
+    if _renderer is None:
+        _renderer = Renderer()
+    return _renderer
@@ -0,0 +1,252 @@
+import itertools
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import torch
+from app.core.config import get_settings
+from app.features.yolo.loader import ensure_yolov5_path
+
+ensure_yolov5_path()
+
+from utils.metrics import box_iou  # noqa: E402
+
+TENTATIVE, TRACKED, LOST = "tentative", "tracked", "lost"
+
+_track_ids = itertools.count(1)  # ✅ unique across cameras and models, so ids can go into anomaly docs
+
+
+def xyxy_to_cxcywh(boxes: np.ndarray) -> np.ndarray:
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    return np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2,
+                     boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]], 1)
+
+
+def cxcywh_to_xyxy(boxes: np.ndarray) -> np.ndarray:
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    half = np.maximum(boxes[:, 2:], 1.0) / 2  # a shrinking velocity must not flip the box
+    return np.concatenate([boxes[:, :2] - half, boxes[:, :2] + half], 1)
+
+
+class KalmanBoxFilter:
+    """
+    Constant-velocity Kalman filter on (cx, cy, w, h) with velocities, batched
+    over tracks: means are (N, 8), covariances (N, 8, 8). Time is in seconds,
+    so irregular frame spacing (gating, cadence) is handled naturally. Noise
+    scales with box height, as in SORT/ByteTrack.
+    """
+
+    std_position = 0.05  # measurement / position noise, fraction of box height
+    std_velocity = 0.25  # velocity noise, fraction of box height per second
+
+    def __init__(self):
+        self._H = np.eye(4, 8)
+
+    def initiate(self, boxes_cxcywh: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        n = len(boxes_cxcywh)
+        mean = np.concatenate([boxes_cxcywh, np.zeros((n, 4))], 1)
+        h = np.maximum(boxes_cxcywh[:, 3], 1.0)
+        std = np.stack([2 * self.std_position * h] * 4 + [10 * self.std_velocity * h] * 4, 1)
+        cov = np.zeros((n, 8, 8))
+        idx = np.arange(8)
+        cov[:, idx, idx] = std ** 2
+        return mean, cov
+
+    def predict(self, mean: np.ndarray, cov: np.ndarray, dt: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        n = len(mean)
+        if not n:
+            return mean, cov
+        F = np.tile(np.eye(8), (n, 1, 1))
+        F[:, [0, 1, 2, 3], [4, 5, 6, 7]] = dt[:, None]
+        h = np.maximum(mean[:, 3], 1.0)
+        q = np.stack([self.std_position * h] * 4 + [self.std_velocity * h] * 4, 1) ** 2 * np.maximum(dt, 1e-3)[:, None]
+        Q = np.zeros((n, 8, 8))
+        idx = np.arange(8)
+        Q[:, idx, idx] = q
+        mean = np.einsum("nij,nj->ni", F, mean)
+        cov = F @ cov @ F.transpose(0, 2, 1) + Q
+        return mean, cov
+
+    def update(self, mean: np.ndarray, cov: np.ndarray, boxes_cxcywh: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if not len(mean):
+            return mean, cov
+        H = self._H
+        h = np.maximum(mean[:, 3], 1.0)
+        R = np.zeros((len(mean), 4, 4))
+        idx = np.arange(4)
+        R[:, idx, idx] = (self.std_position * h)[:, None] ** 2
+        S = H @ cov @ H.T + R  # (N, 4, 4)
+        PHt = cov @ H.T  # (N, 8, 4)
+        K = np.linalg.solve(S, PHt.transpose(0, 2, 1)).transpose(0, 2, 1)  # P H^T S^-1
+        innovation = boxes_cxcywh - mean[:, :4]
+        mean = mean + np.einsum("nij,nj->ni", K, innovation)
+        cov = cov - K @ H @ cov
+        return mean, cov
+
+
+class Track:
+    """One tracked object of one model on one camera."""
+
+    __slots__ = ("id", "cls", "conf", "mean", "cov", "hits", "state", "first_seen", "last_seen",
+                 "alert_since", "below_since", "last_alert")
+
+    def __init__(self, cls: int, conf: float, mean: np.ndarray, cov: np.ndarray, now: float):
+        self.id = next(_track_ids)
+        self.cls = cls
+        self.conf = conf
+        self.mean = mean
+        self.cov = cov
+        self.hits = 1
+        self.state = TENTATIVE
+        self.first_seen = now
+        self.last_seen = now
+        self.alert_since: Optional[float] = None  # first time this track reached its model's alert threshold
+        self.below_since: Optional[float] = None  # when it last dropped below that threshold
+        self.last_alert: Optional[float] = None
+
+    @property
+    def xyxy(self) -> np.ndarray:
+        return cxcywh_to_xyxy(self.mean[None, :4])[0]
+
+
+class ObjectTracker:
+    """
+    ByteTrack-style multi-object tracker for one model on one camera.
+
+    Detections are split by confidence. High-confidence ones are associated
+    first with every live track (tracked and recently lost); the remaining
+    tracked tracks then get a second chance against the low-confidence
+    detections, so one weak frame does not break a track. Association is
+    class-aware greedy matching on the IoU matrix from utils.metrics.box_iou
+    between Kalman-predicted track boxes and detections. Only high-confidence
+    detections start new tracks; a track is confirmed after `min_hits`
+    matches and dropped after being unmatched for `max_lost_seconds`.
+    """
+
+    def __init__(self, high_conf: float = None, match_iou: float = None, low_match_iou: float = None,
+                 max_lost_seconds: float = None, min_hits: int = None):
+        settings = get_settings()
+        self.high_conf = settings.TRACK_HIGH_CONF if high_conf is None else high_conf
+        self.match_iou = settings.TRACK_MATCH_IOU if match_iou is None else match_iou
+        self.low_match_iou = settings.TRACK_LOW_MATCH_IOU if low_match_iou is None else low_match_iou
+        self.max_lost_seconds = settings.TRACK_MAX_LOST_SECONDS if max_lost_seconds is None else max_lost_seconds
+        self.min_hits = settings.TRACK_MIN_HITS if min_hits is None else min_hits
+
+        self.kf = KalmanBoxFilter()
+        self.tracks: List[Track] = []
+        self._last_update: Optional[float] = None
+
+    def predict(self, now: float):
+        """Advance every track to `now` (no detections involved)."""
+        if not self.tracks:
+            self._last_update = now
+            return
+        mean = np.stack([t.mean for t in self.tracks])
+        cov = np.stack([t.cov for t in self.tracks])
+        dt = np.full(len(self.tracks), max(0.0, now - (self._last_update or now)))
+        mean, cov = self.kf.predict(mean, cov, dt)
+        for t, m, c in zip(self.tracks, mean, cov):
+            t.mean, t.cov = m, c
+        self._last_update = now
+
+    def update(self, dets: np.ndarray, now: float) -> Tuple[np.ndarray, List[Track]]:
+        """
+        Feed one frame of detections (structured array with xyxy/conf/cls, see Detections.numpy()).
+        Returns (track id per detection, -1 if unassigned) and the tracks that ended.
+        """
+        self.predict(now)
+        assigned = np.full(len(dets), -1, dtype=np.int64)
+        conf = dets["conf"]
+        high = np.flatnonzero(conf >= self.high_conf)
+        low = np.flatnonzero(conf < self.high_conf)
+
+        # 1️⃣ High-confidence detections against every live track
+        pairs, free_tracks, free_high = self._associate(list(range(len(self.tracks))), high, dets, self.match_iou)
+        # 2️⃣ Low-confidence detections keep currently tracked objects alive
+        retry = [i for i in free_tracks if self.tracks[i].state == TRACKED]
+        low_pairs, _, _ = self._associate(retry, low, dets, self.low_match_iou)
+        pairs += low_pairs
+
+        if pairs:
+            ti = [p[0] for p in pairs]
+            di = np.array([p[1] for p in pairs])
+            mean, cov = self.kf.update(np.stack([self.tracks[i].mean for i in ti]),
+                                       np.stack([self.tracks[i].cov for i in ti]),
+                                       xyxy_to_cxcywh(dets["xyxy"][di]))
+            for k, (i, d) in enumerate(pairs):
+                t = self.tracks[i]
+                t.mean, t.cov = mean[k], cov[k]
+                t.conf = float(conf[d])
+                t.hits += 1
+                t.last_seen = now
+                if t.state != TRACKED and t.hits >= self.min_hits:
+                    t.state = TRACKED
+                assigned[d] = t.id
+
+        matched = {p[0] for p in pairs}
+        for i, t in enumerate(self.tracks):
+            if i not in matched and t.state == TRACKED:
+                t.state = LOST
+
+        # 🆕 Unmatched high-confidence detections start tracks
+        if len(free_high):
+            mean, cov = self.kf.initiate(xyxy_to_cxcywh(dets["xyxy"][free_high]))
+            for k, d in enumerate(free_high):
+                t = Track(int(dets["cls"][d]), float(conf[d]), mean[k], cov[k], now)
+                if t.hits >= self.min_hits:
+                    t.state = TRACKED
+                self.tracks.append(t)
+                assigned[d] = t.id
+
+        # Tentative tracks die on their first miss; others after max_lost_seconds
+        ended = [t for i, t in enumerate(self.tracks) if i not in matched and t.last_seen < now
+                 and (t.state == TENTATIVE or now - t.last_seen > self.max_lost_seconds)]
+        if ended:
+            gone = {t.id for t in ended}
+            self.tracks = [t for t in self.tracks if t.id not in gone]
+        return assigned, ended
+
+    def _associate(self, track_idx: List[int], det_idx: np.ndarray, dets: np.ndarray, min_iou: float):
+        """Greedy highest-IoU-first matching of same-class pairs. Returns (pairs, unmatched tracks, unmatched dets)."""
+        if not track_idx or not len(det_idx):
+            return [], list(track_idx), np.asarray(det_idx)
+
+        track_boxes = torch.from_numpy(np.stack([self.tracks[i].xyxy for i in track_idx]))
+        det_boxes = torch.from_numpy(dets["xyxy"][det_idx].astype(np.float64))
+        iou = box_iou(track_boxes, det_boxes).numpy()
+        same_cls = np.array([self.tracks[i].cls for i in track_idx])[:, None] == dets["cls"][det_idx][None, :]
+        iou = np.where(same_cls & (iou >= min_iou), iou, 0.0)
+
+        pairs, used_t, used_d = [], set(), set()
+        rows, cols = np.nonzero(iou)
+        for r, c in sorted(zip(rows.tolist(), cols.tolist()), key=lambda rc: -iou[rc[0], rc[1]]):
+            if r in used_t or c in used_d:
+                continue
+            used_t.add(r)
+            used_d.add(c)
+            pairs.append((track_idx[r], int(det_idx[c])))
+
+        free_tracks = [track_idx[r] for r in range(len(track_idx)) if r not in used_t]
+        free_dets = np.asarray([det_idx[c] for c in range(len(det_idx)) if c not in used_d], dtype=np.int64)
+        return pairs, free_tracks, free_dets
+
+    def live_tracks(self) -> List[Track]:
+        return [t for t in self.tracks if t.state == TRACKED]
+
+    def visible_tracks(self) -> List[Track]:
+        """Tracks worth drawing between detections (not lost)."""
+        return [t for t in self.tracks if t.state != LOST]
+
+
+class TrackerSet:
+    """One ObjectTracker per model for a camera."""
+
+    def __init__(self):
+        self.trackers: Dict[str, ObjectTracker] = {}
+
+    def get(self, model_name: str) -> ObjectTracker:
+        tracker = self.trackers.get(model_name)
+        if tracker is None:
+            tracker = self.trackers[model_name] = ObjectTracker()
+        return tracker
+
+    def get_stats(self) -> Dict[str, int]:
+        return {m: len(t.live_tracks()) for m, t in self.trackers.items()}
@@ -1,33 +1,15 @@
-import cv2
-import time
-from fastapi import APIRouter, Response
+from typing import Optional
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from app.features.pipeline.stream_manager import StreamManager
+from app.features.pipeline.broadcaster import mjpeg_frames
 
 router = APIRouter(prefix="/video", tags=["video"])
 
-def generate_frames():
-    stream = StreamManager.get_instance()
-
-    while True:
-        if stream.last_frame is None:
-            time.sleep(0.05)
-            continue
-
-        ret, buffer = cv2.imencode(".jpg", stream.last_frame)
-        if not ret:
-            time.sleep(0.05)
-            continue
-
-        frame = buffer.tobytes()
-        yield (
-            b"--frame\r\n"
-            b"Content-Type: image/jpeg\r\n\r\n" + frame + b"\r\n"
-        )
-        time.sleep(0.03)  # regulate frame rate
-
 @router.get("/feed")
-async def video_feed():
+async def video_feed(camera_id: Optional[str] = None):
     """
-    Stream YOLO detection frames to the frontend.
+    Stream YOLO detection frames of one camera to the frontend.
     """
-    return Response(generate_frames(), media_type="multipart/x-mixed-replace; boundary=frame")
+    sm = StreamManager.get_instance()
+    return StreamingResponse(mjpeg_frames(sm, camera_id), media_type="multipart/x-mixed-replace; boundary=frame")
@@ -0,0 +1,146 @@
+import json
+import shutil
+from pathlib import Path
+from typing import Optional, Tuple
+import cv2
+import numpy as np
+import torch
+from app.core.config import get_settings
+from app.features.yolo.loader import hub_lock, artifact_root, ensure_yolov5_path, file_sha256
+
+ensure_yolov5_path()
+
+from models.common import AutoShape, DetectMultiBackend  # noqa: E402
+from utils.augmentations import letterbox  # noqa: E402
+
+# ✅ Backend name -> (export.py --include argument, artifact suffix)
+BACKENDS = {
+    "torchscript": ("torchscript", ".torchscript"),
+    "onnx": ("onnx", ".onnx"),
+    "openvino": ("openvino", "_openvino_model"),
+}
+QUANT_MANIFEST = "quantized.json"  # written by app.features.yolo.quantize
+INT8_SUFFIX = "_int8_openvino_model"
+
+
+class ParityError(RuntimeError):
+    """Exported artifact does not reproduce the PyTorch model's outputs."""
+
+
+def backend_for(name: str) -> str:
+    """Configured backend for a model name (e.g. 'weapon'), falling back to MODEL_BACKENDS['default']."""
+    backends = get_settings().MODEL_BACKENDS
+    return backends.get(name, backends.get("default", "pt")).lower()
+
+
+def artifact_dir(weights: Path) -> Path:
+    """Per-checkpoint directory keyed by weight hash, so retrained weights never reuse stale exports."""
+    return artifact_root() / f"{weights.stem}-{file_sha256(weights)[:16]}"
+
+
+def export_artifact(weights: Path, backend: str) -> Path:
+    """Export `weights` to `backend` once and return the cached artifact path."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unsupported backend '{backend}'. Valid: pt, {', '.join(BACKENDS)}")
+    include, suffix = BACKENDS[backend]
+
+    out_dir = artifact_dir(weights)
+    target = out_dir / f"{weights.stem}{suffix}"
+    if target.exists():
+        print(f"[MODEL] 💾 Using cached {backend} artifact: {target}")
+        return target
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    local_pt = out_dir / weights.name
+    if not local_pt.exists():
+        shutil.copy2(weights, local_pt)  # export.py writes next to the weights it is given
+
+    print(f"[MODEL] 🔧 Exporting {weights.name} to {backend}...")
+    import export as yolo_export  # vendored yolov5/export.py
+
+    # Dynamic axes: AutoShape sends letterboxed, non-square batches of varying size
+    with hub_lock:  # exports share yolov5's global logger/warnings state with hub loads
+        yolo_export.run(weights=local_pt, include=(include,), imgsz=(640, 640), device="cpu", dynamic=True)
+    if not target.exists():
+        raise RuntimeError(f"{backend} export of {weights.name} produced no artifact")
+    print(f"[MODEL] ✅ Exported {weights.name} -> {target}")
+    return target
+
+
+def quantized_artifact(weights: Path) -> Optional[Path]:
+    """Promoted INT8 artifact for these exact weights, if the quantize command produced one."""
+    manifest_path = artifact_dir(weights) / QUANT_MANIFEST
+    if not manifest_path.exists():
+        return None
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except ValueError:
+        return None
+    artifact = manifest_path.parent / manifest.get("artifact", "")
+    if not manifest.get("promoted") or not artifact.exists():
+        return None
+    return artifact
+
+
+def calibration_tensor(size: int = 640) -> Tuple[torch.Tensor, np.ndarray]:
+    """Letterboxed BCHW float tensor from MODEL_CALIBRATION_IMAGE (or a seeded synthetic frame)."""
+    path = get_settings().MODEL_CALIBRATION_IMAGE
+    im = cv2.imread(path) if path else None
+    if im is None:
+        im = np.random.default_rng(0).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    x = letterbox(im, size, auto=False)[0]
+    x = np.ascontiguousarray(x[..., ::-1].transpose(2, 0, 1))  # BGR HWC -> RGB CHW
+    return torch.from_numpy(x).float().unsqueeze(0) / 255, im
+
+
+def model_device(model) -> torch.device:
+    """Device of an AutoShape model, whether it wraps a DetectMultiBackend or a bare DetectionModel."""
+    inner = model.model
+    return inner.device if isinstance(inner, DetectMultiBackend) else next(inner.parameters()).device
+
+
+def _raw(model, x: torch.Tensor) -> torch.Tensor:
+    y = model(x)
+    y = y[0] if isinstance(y, (list, tuple)) else y
+    return (torch.from_numpy(y) if isinstance(y, np.ndarray) else y).float().cpu()
+
+
+@torch.no_grad()
+def check_parity(reference: AutoShape, candidate: DetectMultiBackend) -> Tuple[float, float]:
+    """
+    Compare raw predictions of the .pt model and an exported backend on the calibration image.
+    Returns (max score diff, max box diff in px) or raises ParityError.
+    """
+    settings = get_settings()
+    x, _ = calibration_tensor()
+    ref = _raw(reference.model, x.to(model_device(reference)))
+    out = _raw(candidate, x.to(candidate.device))
+    if ref.shape != out.shape:
+        raise ParityError(f"output shape {tuple(out.shape)} != {tuple(ref.shape)}")
+
+    score_err = float((ref[..., 4:] - out[..., 4:]).abs().max())
+    confident = ref[..., 4] > 0.1  # box coordinates of near-empty anchors are noise
+    box_err = float((ref[..., :4][confident] - out[..., :4][confident]).abs().max()) if confident.any() else 0.0
+
+    if score_err > settings.MODEL_PARITY_SCORE_ATOL or box_err > settings.MODEL_PARITY_BOX_ATOL:
+        raise ParityError(f"max score diff {score_err:.4f}, max box diff {box_err:.2f}px")
+    return score_err, box_err
+
+
+def load_backend(reference: AutoShape, weights: Path, backend: str, artifact: Optional[Path] = None,
+                 verify: bool = True) -> AutoShape:
+    """
+    Serve `weights` through `backend` with the same AutoShape interface as the .pt model.
+    Raises if export fails or the artifact does not match `reference`.
+    """
+    artifact = artifact or export_artifact(weights, backend)
+    dmb = DetectMultiBackend(str(artifact), device=model_device(reference), fuse=True)
+
+    if verify:
+        score_err, box_err = check_parity(reference, dmb)
+        print(f"[MODEL] ✅ {backend} parity OK for {weights.name} (score Δ {score_err:.4f}, box Δ {box_err:.2f}px)")
+
+    model = AutoShape(dmb)
+    for attr in ("conf", "iou", "agnostic", "multi_label", "classes", "max_det"):
+        setattr(model, attr, getattr(reference, attr))
+    return model
@@ -0,0 +1,72 @@
+from typing import List, Sequence
+import numpy as np
+import torch
+import torchvision
+from app.features.yolo.loader import ensure_yolov5_path
+
+ensure_yolov5_path()
+
+from models.common import Detections  # noqa: E402
+from utils.general import Profile  # noqa: E402
+
+
+def expand_boxes(boxes: np.ndarray, shape, pad: float = 0.25, min_size: int = 64) -> np.ndarray:
+    """
+    Grow (N, 4) xyxy boxes by `pad` of their size on every side, enforce a
+    minimum side of `min_size` pixels and clip to the (h, w) frame.
+    """
+    h, w = shape[:2]
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    if not len(boxes):
+        return np.zeros((0, 4), dtype=np.int32)
+    cx, cy = (boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2
+    bw = np.maximum((boxes[:, 2] - boxes[:, 0]) * (1 + 2 * pad), min_size)
+    bh = np.maximum((boxes[:, 3] - boxes[:, 1]) * (1 + 2 * pad), min_size)
+    out = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], 1)
+    out[:, [0, 2]] = out[:, [0, 2]].clip(0, w)
+    out[:, [1, 3]] = out[:, [1, 3]].clip(0, h)
+    out = np.round(out).astype(np.int32)
+    return out[(out[:, 2] - out[:, 0] > 1) & (out[:, 3] - out[:, 1] > 1)]
+
+
+def detect_on_crops(model, frames: Sequence[np.ndarray], regions: Sequence[np.ndarray]) -> List[Detections]:
+    """
+    Run an AutoShape model on crops instead of whole frames.
+
+    `regions[i]` holds int xyxy crop boxes for `frames[i]`. All crops of all
+    frames go through one batched call; the resulting boxes are shifted back
+    into frame coordinates and overlapping detections from neighbouring
+    crops are merged with class-wise NMS. Returns one single-image
+    Detections per frame, as if the model had seen the full frame.
+    """
+    crops, owners, offsets = [], [], []
+    for i, (frame, boxes) in enumerate(zip(frames, regions)):
+        for x1, y1, x2, y2 in np.asarray(boxes, dtype=np.int32).reshape(-1, 4).tolist():
+            crops.append(frame[y1:y2, x1:x2])
+            owners.append(i)
+            offsets.append((x1, y1))
+
+    per_frame = [[] for _ in frames]
+    shape = (1, 3, 0, 0)
+    if crops:
+        batch = model(crops)
+        shape = batch.s
+        for pred, i, (dx, dy) in zip(batch.pred, owners, offsets):
+            if len(pred):
+                pred = pred.clone()
+                pred[:, [0, 2]] += dx
+                pred[:, [1, 3]] += dy
+                per_frame[i].append(pred)
+
+    iou = getattr(model, "iou", 0.45)
+    device = next((p[0].device for p in per_frame if p), torch.device("cpu"))
+    out = []
+    for frame, preds in zip(frames, per_frame):
+        if preds:
+            pred = torch.cat(preds, 0)
+            keep = torchvision.ops.batched_nms(pred[:, :4], pred[:, 4], pred[:, 5].long(), iou)
+            pred = pred[keep]
+        else:
+            pred = torch.zeros((0, 6), device=device)
+        out.append(Detections([frame], [pred], ["image0.jpg"], (Profile(), Profile(), Profile()), model.names, shape))
+    return out
@@ -11,20 +11,18 @@ MODELS = ["people.pt", "weapon.pt"]
 def detect_all(frame: np.ndarray) -> List[Dict]:
     """Run detection on all YOLO models and return anomalies list."""
     results = []
+    settings = get_settings()
     for model_name in MODELS:
         model = load_model(model_name)
         res = model(frame)
-        df = res.pandas().xyxy[0]
-        for _, r in df.iterrows():
-            label = r["name"]
-            conf = float(r["confidence"])
-            settings = get_settings()
-            threshold = settings.MODEL_THRESHOLDS.get(model_name, settings.MODEL_THRESHOLDS["default"])
-            if conf >= threshold:
-                results.append({
-                    "model": model_name,
-                    "label": label,
-                    "confidence": conf,
-                    "timestamp": datetime.utcnow().isoformat()
-                })
+        threshold = settings.MODEL_THRESHOLDS.get(model_name, settings.MODEL_THRESHOLDS["default"])
+        dets = res.numpy()[0]
+        dets = dets[dets["conf"] >= threshold]
+        for conf, cls in zip(dets["conf"].tolist(), dets["cls"].tolist()):
+            results.append({
+                "model": model_name,
+                "label": res.names[cls],
+                "confidence": conf,
+                "timestamp": datetime.utcnow().isoformat()
+            })
     return results
@@ -3,6 +3,7 @@ import pathlib
 import torch
 import traceback
 import logging
+import threading
 
 
 
@@ -21,6 +22,7 @@ logging.getLogger("yolo_loader").setLevel(logging.DEBUG)
 MODEL_ROOT = Path(__file__).resolve().parents[2] / "ai_models"
 YOLOV5_ROOT = Path(__file__).resolve().parents[2] / "yolov5"
 _cache = {}
+hub_lock = threading.Lock()  # torch.hub.load swaps sys.path / imports hubconf: not thread-safe
 
 print(f"[DEBUG] MODEL_ROOT={MODEL_ROOT} exists={MODEL_ROOT.exists()}")
 print(f"[DEBUG] YOLOV5_ROOT={YOLOV5_ROOT} exists={YOLOV5_ROOT.exists()}")
@@ -28,16 +30,108 @@ print(f"[DEBUG] YOLOV5_ROOT={YOLOV5_ROOT} exists={YOLOV5_ROOT.exists()}")
 from app.core.config import get_settings
 import urllib.request
 import os
+import sys
+import hashlib
+
+
+def ensure_yolov5_path():
+    """Make the vendored YOLOv5 packages (`models`, `utils`) importable outside torch.hub."""
+    repo = str(YOLOV5_ROOT.resolve())
+    if repo not in sys.path:
+        sys.path.insert(0, repo)
+    return repo
+
+
+def artifact_root() -> Path:
+    """Directory for exported / compiled model artifacts (MODEL_ARTIFACT_DIR or ai_models/.artifacts)."""
+    configured = get_settings().MODEL_ARTIFACT_DIR
+    return Path(configured) if configured else MODEL_ROOT / ".artifacts"
+
+
+def file_sha256(path: Path, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _default_device() -> str:
+    """Device torch.hub / select_device would pick for this process."""
+    return "cuda:0" if torch.cuda.is_available() else "cpu"
+
+
+def compiled_path(weights: Path, device: str) -> Path:
+    """Compiled-cache entry keyed by weight hash, torch version and device."""
+    key = f"{file_sha256(weights)[:16]}-torch{torch.__version__}-{device.replace(':', '')}"
+    return artifact_root() / "compiled" / f"{weights.stem}-{key}.pt"
+
+
+def load_compiled(weights: Path):
+    """
+    Warm start: rebuild the ready-to-run AutoShape model from the compiled cache.
+    Skips torch.hub resolution, attempt_load and Conv+BN fusion. Returns None on a miss.
+    The result is AutoShape(DetectMultiBackend), exactly like the cold torch.hub path
+    (int stride, dmb/pt set), so consumers never see which path produced it.
+    """
+    device = _default_device()
+    path = compiled_path(weights, device)
+    if not path.exists():
+        return None
+    try:
+        ensure_yolov5_path()
+        from models.common import AutoShape, DetectMultiBackend
+
+        backend = torch.load(path, map_location=device, weights_only=False)
+        if not isinstance(backend, DetectMultiBackend):  # entry written by an older version (bare DetectionModel)
+            print(f"[MODEL] ♻️ Compiled cache entry {path.name} has an old format, rebuilding it")
+            return None
+        model = AutoShape(backend, verbose=False)
+        print(f"[MODEL] ⚡ Loaded compiled model from cache: {path.name}")
+        return model
+    except Exception as e:
+        print(f"[MODEL] ⚠️ Compiled cache entry unusable ({path.name}), reloading from weights: {e}")
+        return None
+
+
+def save_compiled(weights: Path, model):
+    """Store the DetectMultiBackend (with its fused DetectionModel) of an AutoShape model for the next restart."""
+    ensure_yolov5_path()
+    from models.common import DetectMultiBackend
+
+    inner = getattr(model, "model", None)
+    if not isinstance(inner, DetectMultiBackend) or not inner.pt:
+        return
+
+    path = compiled_path(weights, str(next(inner.parameters()).device))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".tmp{os.getpid()}")
+    try:
+        torch.save(inner, tmp)
+        os.replace(tmp, path)  # ✅ atomic: a crash never leaves a half-written entry
+    except Exception as e:
+        print(f"[MODEL] ⚠️ Could not write compiled cache for {weights.name}: {e}")
+        tmp.unlink(missing_ok=True)
+        return
+
+    # Entries for older weights / torch versions of this model on this device are dead weight
+    device_suffix = path.name.rsplit("-", 1)[-1]
+    for stale in path.parent.glob(f"{weights.stem}-*-{device_suffix}"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    print(f"[MODEL] 💾 Compiled model cached: {path.name}")
+
 
 def model_path(filename: str) -> str:
     """
-    Returns path to model file. If not found locally, returns GitHub release URL.
+    Returns path to model file. If not found in MODEL_ROOT, it is fetched into the
+    local model store (resumable download, SHA-256 verified) from settings.MODEL_URLS.
     
     Args:
         filename: Name of the model file (e.g., 'weapon.pt')
         
     Returns:
-        str: Local path or remote URL to the model
+        str: Local path to the model
     """
     path = MODEL_ROOT / filename
     
@@ -46,7 +140,7 @@ def model_path(filename: str) -> str:
         print(f"[MODEL] ✅ Using local model: {filename}")
         return str(path)
     
-    # Model not found locally - use remote URL
+    # Model not found locally - use the content-addressed store
     print(f"[MODEL] ⚠️ Model file not found locally: {filename}")
     
     get_settings.cache_clear()  # Force reload settings to get latest URLs
@@ -58,8 +152,10 @@ def model_path(filename: str) -> str:
             f"[ERROR] Model {filename} missing and no valid URL configured in settings.MODEL_URLS."
         )
     
-    print(f"[MODEL] 🌐 Using remote model from: {url}")
-    return url
+    from app.features.yolo.model_store import get_model_store
+
+    print(f"[MODEL] 🌐 Fetching remote model into local store from: {url}")
+    return str(get_model_store().fetch(filename, url))
 
 def load_model(filename: str):
     """
@@ -104,10 +200,19 @@ def load_model(filename: str):
         print(f"[MODEL] ❌ CRITICAL: hubconf.py not found at {hubconf_path}")
         raise FileNotFoundError(f"hubconf.py not found at {hubconf_path}")
 
+    # ⚡ Warm restart: fused model straight from the on-disk compiled cache
+    use_compiled = not is_url and get_settings().MODEL_COMPILED_CACHE
+    model = load_compiled(Path(weights)) if use_compiled else None
+    if model is not None:
+        model = _with_backend(model, Path(weights))
+        _cache[filename] = model
+        return model
+
     try:
         print(f"[MODEL] 🔧 Calling torch.hub.load...")
         # torch.hub.load can handle both local paths and URLs
-        model = torch.hub.load(repo, "custom", path=weights, source="local", force_reload=True)
+        with hub_lock:
+            model = torch.hub.load(repo, "custom", path=weights, source="local", force_reload=True)
         print(f"[MODEL] ✅ Loaded YOLOv5 model successfully: {filename}")
     except Exception as e:
         print(f"[MODEL] ❌ Failed to load YOLOv5 model: {filename}")
@@ -116,6 +221,42 @@ def load_model(filename: str):
         print(traceback.format_exc())
         raise
 
+    if use_compiled:
+        save_compiled(Path(weights), model)
+
+    # ✅ Optional faster runtime (TorchScript / ONNX Runtime / OpenVINO) behind the same AutoShape API
+    if not is_url:
+        model = _with_backend(model, Path(weights))
+
     _cache[filename] = model
     print(f"[MODEL] 💾 Model cached: {filename}")
     return model
+
+
+def unload_model(filename: str):
+    """Drop a model from the in-process cache so its memory can be reclaimed."""
+    _cache.pop(filename, None)
+
+
+def _with_backend(model, weights: Path):
+    """Swap the eager .pt model for its configured export; keeps the .pt model if export or parity fails."""
+    from app.features.yolo import backends
+
+    # ✅ A promoted INT8 artifact was already validated by mAP, so it skips the FP32 parity check
+    quantized = backends.quantized_artifact(weights) if get_settings().MODEL_PREFER_QUANTIZED else None
+    if quantized is not None:
+        try:
+            model_q = backends.load_backend(model, weights, "openvino", artifact=quantized, verify=False)
+            print(f"[MODEL] ✅ Serving INT8 artifact for {weights.name}: {quantized.name}")
+            return model_q
+        except Exception as e:
+            print(f"[MODEL] ⚠️ INT8 artifact unusable for {weights.name}: {e}")
+
+    backend = backends.backend_for(weights.stem)
+    if backend == "pt":
+        return model
+    try:
+        return backends.load_backend(model, weights, backend)
+    except Exception as e:
+        print(f"[MODEL] ⚠️ {backend} backend unavailable for {weights.name}, serving PyTorch weights: {e}")
+        return model
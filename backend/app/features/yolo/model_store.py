@@ -0,0 +1,158 @@
+import http.client
+import os
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+from app.core.config import get_settings
+from app.features.yolo.loader import MODEL_ROOT, file_sha256
+
+try:
+    import fcntl  # POSIX only: cross-process lock for replicas sharing the store
+except ImportError:  # pragma: no cover - Windows dev boxes
+    fcntl = None
+
+
+class ModelStoreError(RuntimeError):
+    """Download failed or the file does not match its manifest checksum."""
+
+
+class ModelStore:
+    """
+    Content-addressed local cache of model checkpoints.
+
+    Blobs live at <root>/sha256/<digest>/<filename>, so the path is fully
+    determined by the content while the original filename (which the loader
+    uses as the model name) is kept. Downloads go to <root>/partial, resume
+    with HTTP Range requests after an interruption, are checked against
+    MODEL_SHA256 and are moved into place atomically. Several replicas can
+    point MODEL_STORE_DIR at the same mount; a lock file per model makes sure
+    only one of them downloads.
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        settings = get_settings()
+        self.root = Path(root or settings.MODEL_STORE_DIR or MODEL_ROOT / ".store")
+        self.timeout = settings.MODEL_DOWNLOAD_TIMEOUT
+        self.retries = settings.MODEL_DOWNLOAD_RETRIES
+        self.chunk = 1 << 20
+
+    # ---------- Lookup ----------
+    def blob_path(self, digest: str, filename: str) -> Path:
+        return self.root / "sha256" / digest / filename
+
+    def ref_path(self, filename: str) -> Path:
+        return self.root / "refs" / filename
+
+    def expected_digest(self, filename: str) -> Optional[str]:
+        """Manifest checksum from settings, else the digest recorded when the file was first stored."""
+        digest = get_settings().MODEL_SHA256.get(filename)
+        if digest:
+            return digest.lower()
+        ref = self.ref_path(filename)
+        return ref.read_text().strip() if ref.exists() else None
+
+    def lookup(self, filename: str) -> Optional[Path]:
+        digest = self.expected_digest(filename)
+        if digest:
+            path = self.blob_path(digest, filename)
+            if path.exists():
+                return path
+        return None
+
+    # ---------- Fetch ----------
+    def fetch(self, filename: str, url: str) -> Path:
+        """Return the verified local blob for `filename`, downloading (and resuming) it if needed."""
+        path = self.lookup(filename)
+        if path is not None:
+            print(f"[MODEL] 💾 Using stored model: {filename} ({path.parent.name[:12]})")
+            return path
+
+        with self._locked(filename):
+            path = self.lookup(filename)  # another replica may have finished while we waited
+            if path is not None:
+                return path
+
+            expected = self.expected_digest(filename)
+            part = self.root / "partial" / f"{filename}.{expected or 'unverified'}.part"
+            part.parent.mkdir(parents=True, exist_ok=True)
+            self._download(url, part)
+
+            digest = file_sha256(part)
+            if expected and digest != expected:
+                part.unlink(missing_ok=True)
+                raise ModelStoreError(f"{filename}: checksum mismatch (expected {expected[:12]}…, got {digest[:12]}…)")
+            if not expected:
+                print(f"[MODEL] ⚠️ No MODEL_SHA256 entry for {filename}; storing as sha256:{digest}")
+
+            path = self.blob_path(digest, filename)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(part, path)  # ✅ atomic: readers never see a half-written checkpoint
+            _atomic_write(self.ref_path(filename), digest)
+            print(f"[MODEL] ✅ Stored {filename} as sha256:{digest[:12]}…")
+            return path
+
+    def _download(self, url: str, part: Path):
+        delay = 1.0
+        for attempt in range(self.retries + 1):
+            offset = part.stat().st_size if part.exists() else 0
+            req = urllib.request.Request(url, headers={"Range": f"bytes={offset}-"} if offset else {})
+            try:
+                with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                    if offset and resp.status != 206:
+                        offset = 0  # server ignored the Range header: start over
+                    mode = "ab" if offset else "wb"
+                    if offset:
+                        print(f"[MODEL] ⏯️ Resuming {part.name} at {offset / 1e6:.1f} MB")
+                    expected_len = resp.headers.get("Content-Length")
+                    written = 0
+                    with open(part, mode) as f:
+                        for block in iter(lambda: resp.read(self.chunk), b""):
+                            f.write(block)
+                            written += len(block)
+                if expected_len is None or written >= int(expected_len):
+                    return
+                raise http.client.IncompleteRead(b"", int(expected_len) - written)
+            except urllib.error.HTTPError as e:
+                if e.code == 416 and offset:
+                    return  # requested range starts at EOF: already complete
+                if attempt >= self.retries or e.code in (401, 403, 404):
+                    raise ModelStoreError(f"Download of {url} failed: HTTP {e.code}") from e
+            except (urllib.error.URLError, http.client.HTTPException, OSError) as e:
+                if attempt >= self.retries:
+                    raise ModelStoreError(f"Download of {url} failed: {e}") from e
+            print(f"[MODEL] 🔁 Download interrupted, retrying in {delay:.0f}s ({attempt + 1}/{self.retries})")
+            time.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+    @contextmanager
+    def _locked(self, filename: str):
+        lock_path = self.root / "locks" / f"{filename}.lock"
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(lock_path, "a") as fh:
+            if fcntl:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _atomic_write(path: Path, text: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+_store: Optional[ModelStore] = None
+
+
+def get_model_store() -> ModelStore:
+    global _store
+    if _store is None:
+        _store = ModelStore()
+    return _store
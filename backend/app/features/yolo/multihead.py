@@ -0,0 +1,183 @@
+import hashlib
+from typing import Any, Dict, List, Optional
+import torch
+import torch.nn as nn
+from app.features.yolo.loader import ensure_yolov5_path
+from app.features.yolo.preprocess import FramePreprocessor, PreparedBatch
+
+ensure_yolov5_path()
+
+from models.common import AutoShape, DetectMultiBackend, Detections  # noqa: E402
+from models.yolo import DetectionModel  # noqa: E402
+from utils.general import Profile, non_max_suppression, scale_boxes  # noqa: E402
+
+
+def unwrap_detection_model(model) -> Optional[DetectionModel]:
+    """Return the underlying DetectionModel of an AutoShape / DetectMultiBackend wrapper (pt backend only)."""
+    m = model
+    if isinstance(m, AutoShape):
+        m = m.model
+    if isinstance(m, DetectMultiBackend):
+        if not m.pt:
+            return None
+        m = m.model
+    return m if isinstance(m, DetectionModel) else None
+
+
+def _layer_key(m: nn.Module, parents: List[str]) -> str:
+    """Fingerprint one layer: its type, wiring, the keys of its inputs and its exact weights."""
+    h = hashlib.sha1()
+    h.update(type(m).__name__.encode())
+    h.update(repr(m.f).encode())
+    for p in parents:
+        h.update(p.encode())
+    for name, t in m.state_dict().items():
+        h.update(name.encode())
+        h.update(str(tuple(t.shape)).encode())
+        h.update(t.detach().cpu().contiguous().numpy().tobytes())
+    return h.hexdigest()
+
+
+class SharedBackboneDetector(nn.Module):
+    """
+    Composite of several YOLOv5 DetectionModels that runs every identical
+    layer only once.
+
+    Each layer gets a key derived from its weights AND the keys of the layers
+    feeding it, so two layers share a key only if the whole sub-graph up to them
+    is identical. With a common backbone/neck this collapses to one backbone
+    pass plus one Detect head per task; with unrelated checkpoints it still
+    dedupes any identical prefix and otherwise degrades to independent models.
+    """
+
+    def __init__(self, models: Dict[str, DetectionModel]):
+        super().__init__()
+        self.heads: List[str] = []
+        self.blocks = nn.ModuleDict()
+        self.plans: Dict[str, List[str]] = {}
+        self.names: Dict[str, Any] = {}
+        self.stride = 32
+
+        usage: Dict[str, int] = {}
+        total = 0
+        for name, dm in models.items():
+            keys: List[str] = []
+            for i, m in enumerate(dm.model):
+                f = [m.f] if isinstance(m.f, int) else list(m.f)
+                parents = ["input" if i == 0 and j == -1 else keys[j if j >= 0 else i + j] for j in f]
+                key = _layer_key(m, parents)
+                if key not in self.blocks:
+                    self.blocks[key] = m
+                usage[key] = usage.get(key, 0) + 1
+                keys.append(key)
+                total += 1
+
+            detect = dm.model[-1]
+            detect.inplace = False  # safe multithread inference
+            detect.export = True  # inference output only
+            self.plans[name] = keys
+            self.names[name] = dm.names
+            self.heads.append(name)
+            self.stride = max(self.stride, int(dm.stride.max()))
+
+        self.shared_keys = {k for k, n in usage.items() if n > 1}
+        self.total_layers = total
+        print(
+            f"[MODEL] 🔗 Shared-backbone detector: {len(self.heads)} heads, "
+            f"{len(self.blocks)}/{total} unique layers ({len(self.shared_keys)} shared)"
+        )
+
+    def forward(self, x, heads: Optional[List[str]] = None) -> Dict[str, torch.Tensor]:
+        """Run the requested heads on a BCHW batch. Shared layers are evaluated once per call."""
+        cache: Dict[str, Any] = {}
+        out: Dict[str, torch.Tensor] = {}
+
+        for name in heads or self.heads:
+            y = []
+            h = x
+            for i, key in enumerate(self.plans[name]):
+                if key in cache:
+                    h = cache[key]
+                else:
+                    m = self.blocks[key]
+                    if m.f != -1:  # if not from previous layer
+                        h = y[m.f] if isinstance(m.f, int) else [h if j == -1 else y[j] for j in m.f]
+                    h = m(h)
+                    if key in self.shared_keys:
+                        cache[key] = h
+                y.append(h)
+            out[name] = h[0] if isinstance(h, (list, tuple)) else h
+
+        return out
+
+    def sharing_report(self) -> Dict[str, Any]:
+        return {
+            "heads": list(self.heads),
+            "total_layers": self.total_layers,
+            "unique_layers": len(self.blocks),
+            "shared_layers": len(self.shared_keys),
+        }
+
+
+class MultiHeadAutoShape:
+    """
+    AutoShape-style front end for SharedBackboneDetector: preprocesses a list
+    of RGB frames once, runs the composite and returns {head: Detections}.
+    """
+
+    conf = 0.25  # NMS confidence threshold
+    iou = 0.45  # NMS IoU threshold
+    max_det = 1000  # maximum number of detections per image
+
+    def __init__(self, detector: SharedBackboneDetector):
+        self.detector = detector.eval()
+        p = next(detector.parameters())
+        self.device = p.device
+        self.dtype = p.dtype
+        self.preprocessor = FramePreprocessor()
+
+    @property
+    def heads(self) -> List[str]:
+        return self.detector.heads
+
+    @torch.no_grad()
+    def __call__(self, ims, heads: Optional[List[str]] = None, size: int = 640) -> Dict[str, Detections]:
+        """RGB frame(s) in, {head: Detections} out — same geometry as AutoShape."""
+        ims = list(ims) if isinstance(ims, (list, tuple)) else [ims]
+        if self.preprocessor.size != size:
+            self.preprocessor = FramePreprocessor(size)
+        return self.run_prepared(self.preprocessor.prepare(ims, self.detector.stride, bgr=False), heads)
+
+    @torch.no_grad()
+    def run_prepared(self, batch: PreparedBatch, heads: Optional[List[str]] = None) -> Dict[str, Detections]:
+        """Run the composite on a batch from the shared FramePreprocessor."""
+        dt = (Profile(), Profile(), Profile())
+        x = batch.tensor(self.device, self.dtype)
+
+        with dt[1]:
+            raw = self.detector(x, heads=[h for h in (heads or self.heads) if h in self.heads])
+
+        results: Dict[str, Detections] = {}
+        files = [f"image{i}.jpg" for i in range(len(batch))]
+        for name, pred in raw.items():
+            with dt[2]:
+                y = non_max_suppression(pred, self.conf, self.iou, max_det=self.max_det)
+                for i, shape0 in enumerate(batch.shape0):
+                    scale_boxes(batch.shape1, y[i][:, :4], shape0)
+            results[name] = Detections(batch.frames, y, files, dt, self.detector.names[name], x.shape)
+        return results
+
+
+def build_shared_detector(models: Dict[str, Any]) -> Optional[MultiHeadAutoShape]:
+    """Build the composite from already-loaded AutoShape models. Models that can't be unwrapped are skipped."""
+    detection_models = {}
+    for name, model in models.items():
+        dm = unwrap_detection_model(model)
+        if dm is None:
+            print(f"[MODEL] ⚠️ {name} is not a PyTorch DetectionModel — keeping it as an independent model")
+            continue
+        detection_models[name] = dm
+
+    if not detection_models:
+        return None
+    return MultiHeadAutoShape(SharedBackboneDetector(detection_models))
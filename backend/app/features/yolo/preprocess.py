@@ -0,0 +1,162 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import cv2
+import numpy as np
+import torch
+from app.features.yolo.loader import ensure_yolov5_path
+
+ensure_yolov5_path()
+
+from models.common import Detections  # noqa: E402
+from utils.general import Profile, make_divisible, non_max_suppression, scale_boxes  # noqa: E402
+
+PAD_VALUE = 114  # letterbox grey, as in training
+
+
+class PreparedBatch:
+    """
+    Frames letterboxed to one inference shape as a normalized float BCHW
+    tensor, plus the geometry needed to map boxes back. The tensor lives in
+    a buffer owned by FramePreprocessor and is overwritten by the next
+    prepare() of the same source and target shapes, so use it within the
+    current cycle.
+    `frames` are kept as given (BGR for live cameras) for Detections.ims.
+    """
+
+    def __init__(self, x: torch.Tensor, frames: List[np.ndarray], shape1: Tuple[int, int]):
+        self.x = x
+        self.frames = frames
+        self.shape0 = [f.shape[:2] for f in frames]
+        self.shape1 = shape1
+        self._on_device: Dict[tuple, torch.Tensor] = {}
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def tensor(self, device, dtype) -> torch.Tensor:
+        """The batch on `device` as `dtype`, transferred/cast once per cycle and shared by all models there."""
+        key = (str(device), dtype)
+        x = self._on_device.get(key)
+        if x is None:
+            x = self.x.to(device, non_blocking=True) if self.x.device != torch.device(device) else self.x
+            x = self._on_device[key] = x.to(dtype) if x.dtype != dtype else x
+        return x
+
+    def select(self, positions: Sequence[int]) -> "PreparedBatch":
+        """Sub-batch of some frames (no copy when all frames are selected)."""
+        positions = list(positions)
+        if positions == list(range(len(self))):
+            return self
+        return PreparedBatch(self.x[positions], [self.frames[i] for i in positions], self.shape1)
+
+
+class FramePreprocessor:
+    """
+    Shared letterbox stage for live inference.
+
+    Each frame is resized once straight into a preallocated uint8 canvas.
+    There is one canvas per batch geometry (source shapes + inference
+    shape), so resolution groups never share memory and the padding is only
+    painted when a canvas is created. Channel swap, HWC->CHW and the /255
+    normalization then happen in a single pass into a preallocated float
+    tensor, pinned when CUDA is available so the host->device copy is
+    asynchronous. The result feeds every model's
+    underlying network directly (see detect_prepared), instead of each
+    AutoShape wrapper repeating the conversion for the same frame.
+    Geometry matches AutoShape exactly, so boxes are identical.
+    """
+
+    MAX_BUFFERS = 16
+
+    def __init__(self, size: int = 640):
+        self.size = size
+        self.pin = torch.cuda.is_available()
+        self._canvas: Dict[tuple, np.ndarray] = {}
+        self._tensors: Dict[tuple, torch.Tensor] = {}
+
+    def prepare(self, frames: Sequence[np.ndarray], stride: int = 32, bgr: bool = True) -> PreparedBatch:
+        """Letterbox + normalize `frames` (BGR by default, RGB with bgr=False) into one batch."""
+        frames = list(frames)
+        shape0 = [f.shape[:2] for f in frames]
+        g = [self.size / max(s) for s in shape0]
+        shape1 = np.array([[int(y * gi) for y in s] for s, gi in zip(shape0, g)]).max(0)
+        h1, w1 = (make_divisible(int(v), stride) for v in shape1)
+
+        layout = []
+        for h0, w0 in shape0:
+            r = min(h1 / h0, w1 / w0)
+            nw, nh = round(w0 * r), round(h0 * r)
+            dw, dh = (w1 - nw) / 2, (h1 - nh) / 2
+            layout.append((round(dh - 0.1), round(dw - 0.1), nh, nw))
+
+        # ✅ Keyed by the source shapes too: two groups that letterbox to the same size
+        # (e.g. one 1080p and one 720p camera) must not overwrite each other's batch
+        key = (tuple(shape0), h1, w1)
+        canvas = self._buffer(key)
+
+        for k, (frame, (top, left, nh, nw)) in enumerate(zip(frames, layout)):
+            roi = canvas[k, top: top + nh, left: left + nw]
+            if frame.shape[:2] == (nh, nw):
+                roi[...] = frame
+            else:
+                out = cv2.resize(frame, (nw, nh), dst=roi, interpolation=cv2.INTER_LINEAR)
+                if not np.shares_memory(out, roi):  # OpenCV could not write into the strided view
+                    roi[...] = out
+
+        # ✅ One pass: uint8 HWC (BGR) -> float CHW (RGB) / 255, into the reused tensor
+        src = torch.from_numpy(canvas)
+        x = self._tensors[key]
+        for c in range(3):
+            torch.div(src[..., 2 - c if bgr else c], 255, out=x[:, c])
+        return PreparedBatch(x, frames, (h1, w1))
+
+    def _buffer(self, key: tuple) -> np.ndarray:
+        canvas = self._canvas.get(key)
+        if canvas is None:
+            if len(self._canvas) >= self.MAX_BUFFERS:  # camera set changed a lot: start over
+                self._canvas.clear()
+                self._tensors.clear()
+            shape0, h, w = key
+            n = len(shape0)
+            canvas = self._canvas[key] = np.full((n, h, w, 3), PAD_VALUE, dtype=np.uint8)
+            self._tensors[key] = torch.empty((n, 3, h, w), dtype=torch.float32, pin_memory=self.pin)
+        return canvas
+
+
+def model_input(model) -> Tuple[Optional[torch.device], Optional[torch.dtype], int]:
+    """(device, dtype, stride) an AutoShape model expects, or (None, None, stride) if it can't take raw tensors."""
+    stride = getattr(model, "stride", 32)  # tensor on AutoShape(DetectionModel), plain int on AutoShape(DetectMultiBackend)
+    stride = int(stride.max()) if isinstance(stride, torch.Tensor) else int(stride)
+    inner = getattr(model, "model", None)
+    if not hasattr(model, "dmb") or inner is None:
+        return None, None, stride
+    if getattr(model, "pt", False):
+        p = next(inner.parameters())
+        return p.device, p.dtype, stride
+    return torch.device(getattr(inner, "device", "cpu")), torch.float32, stride  # exported backends cast themselves
+
+
+@torch.no_grad()
+def detect_prepared(model, batch: PreparedBatch) -> Detections:
+    """
+    AutoShape's inference + post-processing on an already prepared batch:
+    raw forward of model.model, NMS with the model's own settings and boxes
+    scaled back to the original frames.
+    """
+    dt = (Profile(), Profile(), Profile())
+    device, dtype, _ = model_input(model)
+    x = batch.tensor(device, dtype)
+    with dt[1]:
+        y = model.model(x)
+    with dt[2]:
+        y = non_max_suppression(
+            y if model.dmb else y[0],
+            model.conf,
+            model.iou,
+            model.classes,
+            model.agnostic,
+            model.multi_label,
+            max_det=model.max_det,
+        )
+        for i, shape0 in enumerate(batch.shape0):
+            scale_boxes(batch.shape1, y[i][:, :4], shape0)
+    return Detections(batch.frames, y, [f"image{i}.jpg" for i in range(len(batch))], dt, model.names, x.shape)
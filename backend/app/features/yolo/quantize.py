@@ -0,0 +1,173 @@
+"""
+INT8 post-training quantization of the Securo models.
+
+    python -m app.features.yolo.quantize --calib /data/frames [--models weapon fire] [--max-map-delta 0.02]
+
+Camera frames in --calib are the calibration set. If they come with YOLO
+labels (a sibling `labels/` folder, as in YOLOv5 datasets) both models are
+scored against them; otherwise the FP32 model's own detections are used as
+reference, so the reported mAP measures how closely INT8 reproduces FP32.
+A model is only promoted (and then preferred by the loader) if its mAP50-95
+drop stays within QUANT_MAX_MAP_DELTA.
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import cv2
+import numpy as np
+import torch
+import yaml
+from app.core.config import get_settings
+from app.features.yolo import backends
+from app.features.yolo.loader import MODEL_ROOT, file_sha256, hub_lock, load_model
+
+from utils.dataloaders import IMG_FORMATS, img2label_paths  # noqa: E402  (yolov5 path set by backends)
+from utils.general import xywhn2xyxy  # noqa: E402
+from utils.metrics import ap_per_class  # noqa: E402
+from val import process_batch  # noqa: E402
+
+
+def calibration_images(folder: Path) -> List[Path]:
+    files = sorted(p for p in folder.rglob("*") if p.suffix[1:].lower() in IMG_FORMATS)
+    if not files:
+        raise FileNotFoundError(f"No calibration images found in {folder}")
+    return files
+
+
+def _labels_for(image: Path, shape) -> Optional[torch.Tensor]:
+    """YOLO label file for `image` as (M, 5) [cls, x1, y1, x2, y2] in pixels, or None if absent."""
+    label_file = Path(img2label_paths([str(image)])[0])
+    if not label_file.exists():
+        return None
+    rows = np.loadtxt(label_file, ndmin=2, dtype=np.float32).reshape(-1, 5)
+    h, w = shape[:2]
+    boxes = xywhn2xyxy(rows[:, 1:], w=w, h=h)
+    return torch.from_numpy(np.concatenate([rows[:, :1], boxes], 1))
+
+
+@torch.no_grad()
+def evaluate(model, images: List[Path], references: List[torch.Tensor]) -> float:
+    """mAP50-95 of `model` on `images` against per-image reference boxes [cls, x1, y1, x2, y2]."""
+    iouv = torch.linspace(0.5, 0.95, 10)
+    stats = []
+    for path, ref in zip(images, references):
+        im = cv2.imread(str(path))[..., ::-1]  # AutoShape expects RGB
+        pred = model(im).xyxy[0].cpu()
+        if len(pred) == 0:
+            if len(ref):
+                stats.append((torch.zeros(0, 10, dtype=torch.bool), torch.zeros(0), torch.zeros(0), ref[:, 0]))
+            continue
+        correct = process_batch(pred, ref, iouv) if len(ref) else torch.zeros(len(pred), 10, dtype=torch.bool)
+        stats.append((correct, pred[:, 4], pred[:, 5], ref[:, 0]))
+
+    if not stats:
+        return 0.0
+    tp, conf, pred_cls, target_cls = (torch.cat(x, 0).numpy() for x in zip(*stats))
+    if not len(target_cls):
+        return 1.0 if not len(tp) else 0.0  # nothing to find: perfect only if nothing was predicted
+    _, _, _, _, _, ap, _ = ap_per_class(tp, conf, pred_cls, target_cls)
+    return float(ap.mean())
+
+
+def _dataset_yaml(out_dir: Path, calib: Path, names) -> Path:
+    """Minimal dataset YAML for export_openvino's calibration dataloader."""
+    path = out_dir / "calibration.yaml"
+    names = names if isinstance(names, dict) else dict(enumerate(names))
+    with open(path, "w") as f:
+        yaml.safe_dump({"path": str(calib), "train": str(calib), "val": str(calib), "names": names}, f)
+    return path
+
+
+def quantize_model(filename: str, calib: Path, max_delta: float) -> Dict[str, Any]:
+    """Quantize one checkpoint to OpenVINO INT8, compare mAP with FP32 and write the promotion manifest."""
+    weights = MODEL_ROOT / filename
+    if not weights.exists():
+        raise FileNotFoundError(f"{weights} not found (quantization needs local weights)")
+
+    fp32 = load_model(filename)
+    if not getattr(fp32, "pt", True):
+        fp32 = torch.hub.load(backends.ensure_yolov5_path(), "custom", path=str(weights), source="local")  # FP32 reference
+
+    # export_openvino converts the ONNX export that sits next to the weights
+    backends.export_artifact(weights, "onnx")
+    out_dir = backends.artifact_dir(weights)
+    local_pt = out_dir / weights.name
+
+    import export as yolo_export  # vendored yolov5/export.py
+
+    print(f"[QUANT] 🔧 Quantizing {filename} to INT8 with {calib}...")
+    stride = fp32.stride  # tensor on a raw DetectionModel, plain int on AutoShape(DetectMultiBackend) from torch.hub
+    metadata = {"stride": int(stride.max()) if isinstance(stride, torch.Tensor) else int(stride), "names": fp32.names}
+    with hub_lock:
+        f, _ = yolo_export.export_openvino(local_pt, metadata, False, True, str(_dataset_yaml(out_dir, calib, fp32.names)))
+    if not f:
+        raise RuntimeError(f"INT8 export failed for {filename}")
+    artifact = out_dir / f"{weights.stem}{backends.INT8_SUFFIX}"
+
+    int8 = backends.load_backend(fp32, weights, "openvino", artifact=artifact, verify=False)
+
+    images = calibration_images(calib)
+    labels = [_labels_for(p, cv2.imread(str(p)).shape) for p in images]
+    if all(lbl is not None for lbl in labels):
+        reference = "labels"
+        map_fp32 = evaluate(fp32, images, labels)
+    else:
+        # No ground truth: FP32 detections are the reference, so FP32 scores 1.0 by definition
+        reference = "fp32"
+        labels = []
+        for p in images:
+            pred = fp32(cv2.imread(str(p))[..., ::-1]).xyxy[0].cpu()
+            labels.append(torch.cat([pred[:, 5:6], pred[:, :4]], 1))
+        map_fp32 = 1.0
+    map_int8 = evaluate(int8, images, labels)
+
+    delta = map_fp32 - map_int8
+    promoted = delta <= max_delta
+    manifest = {
+        "model": filename,
+        "backend": "openvino",
+        "artifact": artifact.name,
+        "weights_sha256": file_sha256(weights),
+        "calibration_dir": str(calib),
+        "calibration_images": len(images),
+        "reference": reference,
+        "map_fp32": round(map_fp32, 4),
+        "map_int8": round(map_int8, 4),
+        "map_delta": round(delta, 4),
+        "max_map_delta": max_delta,
+        "promoted": promoted,
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    with open(out_dir / backends.QUANT_MANIFEST, "w") as fh:
+        json.dump(manifest, fh, indent=2)
+
+    status = "✅ promoted" if promoted else "❌ NOT promoted"
+    print(f"[QUANT] {status}: {filename} mAP50-95 FP32 {map_fp32:.4f} -> INT8 {map_int8:.4f} (Δ {delta:.4f}, max {max_delta})")
+    return manifest
+
+
+def main(argv=None):
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="INT8 post-training quantization of the Securo models")
+    parser.add_argument("--calib", required=True, type=Path, help="folder of camera frames used for calibration")
+    parser.add_argument("--models", nargs="*", help="model names (default: every model in MODEL_URLS)")
+    parser.add_argument("--max-map-delta", type=float, default=settings.QUANT_MAX_MAP_DELTA)
+    opt = parser.parse_args(argv)
+
+    filenames = [f"{m}.pt" for m in opt.models] if opt.models else list(settings.MODEL_URLS)
+    results = []
+    for filename in filenames:
+        try:
+            results.append(quantize_model(filename, opt.calib, opt.max_map_delta))
+        except Exception as e:
+            print(f"[QUANT] ❌ {filename}: {e}")
+            results.append({"model": filename, "promoted": False, "error": str(e)})
+
+    print(json.dumps(results, indent=2))
+    return 0 if all(r.get("promoted") for r in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
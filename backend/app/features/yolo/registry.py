@@ -0,0 +1,207 @@
+import gc
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import torch
+from app.core.config import get_settings
+from app.features.yolo.loader import load_model, unload_model
+
+# ✅ Model name -> checkpoint in ai_models/
+MODEL_FILES = {
+    "people": "people.pt",
+    "weapon": "weapon.pt",
+    "fire": "fire.pt",
+    "shoplifting": "shoplifting.pt",
+    "crowd": "crowd.pt",
+    "Accident": "Accident.pt",
+    "Vandalism": "Vandalism.pt",
+}
+
+PENDING, LOADING, READY, FAILED, EVICTED = "pending", "loading", "ready", "failed", "evicted"
+
+
+def model_bytes(model) -> int:
+    """Resident size of a loaded model: parameters + buffers, or the artifact size for exported backends."""
+    total = 0
+    if isinstance(model, torch.nn.Module):
+        total = sum(t.numel() * t.element_size() for t in list(model.parameters()) + list(model.buffers()))
+    if total:
+        return total
+
+    w = getattr(getattr(model, "model", None), "w", None)  # DetectMultiBackend artifact path
+    path = Path(w) if w else None
+    if path is None or not path.exists():
+        return 0
+    if path.is_file():
+        return path.stat().st_size
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+class ModelRegistry:
+    """
+    Owns the detection models and their load state.
+
+    Loads run in a background thread pool, so nothing waits for all seven
+    checkpoints: callers see whatever is READY and can request a model on
+    demand with ensure(), which returns immediately.
+
+    With MODEL_MEMORY_BUDGET_MB set, inactive models are evicted least
+    recently used first whenever the resident total exceeds the budget;
+    they reload (from the on-disk compiled/export caches) on activation.
+    """
+
+    def __init__(self, model_files: Dict[str, str] = None):
+        settings = get_settings()
+        self.model_files = dict(model_files or MODEL_FILES)
+        self.models: Dict[str, Any] = {}  # ✅ READY models only
+        self.states: Dict[str, Dict[str, Any]] = {name: self._state(PENDING) for name in self.model_files}
+        self.budget_bytes = int(settings.MODEL_MEMORY_BUDGET_MB * 1024 * 1024)
+        self.last_used: Dict[str, float] = {}
+        self.evictions = 0
+        self._active_provider: Callable[[], Iterable[str]] = lambda: self.model_files.keys()
+        self._futures: Dict[str, Future] = {}
+        self._listeners: List[Callable[[str, str], None]] = []
+        self._lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=max(1, settings.MODEL_LOAD_WORKERS), thread_name_prefix="model-load")
+
+    @property
+    def names(self) -> List[str]:
+        return list(self.model_files)
+
+    def preload(self, names: Optional[List[str]] = None):
+        """Queue background loads (non-blocking). Already loading/ready models are skipped."""
+        for name in names or self.names:
+            self.ensure(name)
+
+    def ensure(self, name: str) -> Optional[Future]:
+        """Make sure `name` is loaded or loading. Returns the load future, or None for unknown names."""
+        if name not in self.model_files:
+            return None
+        with self._lock:
+            fut = self._futures.get(name)
+            if fut is not None and self.states[name]["state"] not in (FAILED, EVICTED):
+                return fut
+            self.states[name] = self._state(LOADING)
+            fut = self.pool.submit(self._load, name)
+            self._futures[name] = fut
+            return fut
+
+    def get(self, name: str):
+        """Ready model (or None); counts as a use for LRU eviction."""
+        model = self.models.get(name)
+        if model is not None:
+            self.last_used[name] = time.time()
+        return model
+
+    def is_ready(self, name: str) -> bool:
+        return name in self.models
+
+    def state(self, name: str) -> str:
+        return self.states.get(name, {}).get("state", PENDING)
+
+    def settled(self) -> bool:
+        """True once no model is pending or loading."""
+        return all(s["state"] in (READY, FAILED, EVICTED) for s in self.states.values())
+
+    def add_listener(self, fn: Callable[[str, str], None]):
+        """fn(name, state) is called after every load finishes and after every eviction."""
+        self._listeners.append(fn)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: dict(s) for name, s in self.states.items()}
+
+    # ---------- Memory budget ----------
+    def set_active_provider(self, fn: Callable[[], Iterable[str]]):
+        """fn() returns the names currently in use; only other models may be evicted."""
+        self._active_provider = fn
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(s["resident_bytes"] or 0 for s in self.states.values() if s["state"] == READY)
+
+    def memory(self) -> Dict[str, Any]:
+        with self._lock:
+            per_model = {n: s["resident_bytes"] for n, s in self.states.items() if s["state"] == READY}
+        return {
+            "budget_bytes": self.budget_bytes or None,
+            "resident_bytes": sum(v or 0 for v in per_model.values()),
+            "per_model": per_model,
+            "evictions": self.evictions,
+        }
+
+    def enforce_budget(self):
+        """Evict inactive models, least recently used first, until resident memory fits the budget."""
+        if not self.budget_bytes:
+            return
+        active = set(self._active_provider())
+        while self.resident_bytes() > self.budget_bytes:
+            idle = [n for n in self.models if n not in active]
+            if not idle:
+                print(f"[MODEL] ⚠️ Active models alone exceed the memory budget ({self.resident_bytes() / 1e6:.0f} MB)")
+                return
+            self.evict(min(idle, key=lambda n: self.last_used.get(n, 0.0)))
+
+    def evict(self, name: str):
+        with self._lock:
+            model = self.models.pop(name, None)
+            if model is None:
+                return
+            freed = self.states[name]["resident_bytes"] or 0
+            self.states[name] = self._state(EVICTED)
+            self._futures.pop(name, None)  # its result would keep the model alive
+            self.evictions += 1
+        unload_model(self.model_files[name])
+        del model
+        self._emit(name, EVICTED)  # ✅ listeners drop their references (e.g. shared-backbone heads) before collecting
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        print(f"[MODEL] ♻️ Evicted inactive model {name} ({freed / 1e6:.0f} MB)")
+
+    def _load(self, name: str):
+        t0 = time.time()
+        try:
+            model = load_model(self.model_files[name])
+        except Exception as e:
+            print(f"[ERROR] Failed to load {name}: {e}")
+            with self._lock:
+                self.states[name] = self._state(FAILED, error=str(e), load_seconds=round(time.time() - t0, 2))
+            self._emit(name, FAILED)
+            return None
+
+        with self._lock:
+            self.models[name] = model
+            self.states[name] = self._state(READY, load_seconds=round(time.time() - t0, 2), resident_bytes=model_bytes(model))
+        self.last_used[name] = time.time()
+        print(f"[MODEL] ✅ Loaded {name} in {time.time() - t0:.1f}s")
+        self._emit(name, READY)
+        self.enforce_budget()
+        return model
+
+    @staticmethod
+    def _state(state: str, error: Optional[str] = None, load_seconds: Optional[float] = None,
+               resident_bytes: Optional[int] = None) -> Dict[str, Any]:
+        return {"state": state, "error": error, "load_seconds": load_seconds, "resident_bytes": resident_bytes}
+
+    def _emit(self, name: str, state: str):
+        for fn in list(self._listeners):
+            try:
+                fn(name, state)
+            except Exception as e:
+                print(f"[ERROR] Model listener failed for {name}: {e}")
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
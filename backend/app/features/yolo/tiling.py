@@ -0,0 +1,142 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import torch
+from app.core.config import get_settings
+from app.features.pipeline.motion_gate import polygon_mask
+from app.features.yolo.loader import ensure_yolov5_path
+
+ensure_yolov5_path()
+
+from models.common import Detections  # noqa: E402
+from utils.general import Profile, clip_boxes, make_divisible, non_max_suppression  # noqa: E402
+
+
+def _starts(length: int, tile: int, overlap: float) -> List[int]:
+    """Tile origins along one axis: evenly spread, first at 0, last flush with the edge."""
+    if length <= tile:
+        return [0]
+    step = max(1, int(tile * (1 - overlap)))
+    n = int(np.ceil((length - tile) / step)) + 1
+    return sorted({int(round(s)) for s in np.linspace(0, length - tile, n)})
+
+
+@dataclass
+class TilePlan:
+    """Tiles (int xyxy) for one frame shape, plus the ROI mask detections must fall in (None = whole frame)."""
+    tiles: np.ndarray
+    mask: Optional[np.ndarray]
+    tile_size: int
+
+
+def plan_tiles(shape: Tuple[int, int], tile: int, overlap: float, regions=None) -> TilePlan:
+    """Overlapping tile grid over an (h, w) frame; with ROI polygons, tiles that miss every polygon are dropped."""
+    h, w = shape[:2]
+    mask = polygon_mask((h, w), regions) if regions else None
+    tiles = []
+    for y in _starts(h, tile, overlap):
+        for x in _starts(w, tile, overlap):
+            x2, y2 = min(x + tile, w), min(y + tile, h)
+            if mask is None or mask[y:y2, x:x2].any():
+                tiles.append((x, y, x2, y2))
+    return TilePlan(np.array(tiles, dtype=np.int32).reshape(-1, 4), mask, tile)
+
+
+class TilePlanner:
+    """
+    Decides per camera and model whether frames are tiled, and caches the
+    tile grid per (camera, frame shape).
+
+    Frames at least INFERENCE_TILE_MIN_WIDTH wide are tiled for the models in
+    INFERENCE_TILE_MODELS (empty = all), so small objects keep their native
+    resolution instead of being downscaled to 640. Cameras with ROI polygons
+    are always tiled, for every model, so only their regions are processed.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.min_width = settings.INFERENCE_TILE_MIN_WIDTH
+        self.overlap = min(max(settings.INFERENCE_TILE_OVERLAP, 0.0), 0.9)
+        self.tile_size = settings.INFERENCE_TILE_SIZE
+        self.max_batch = max(1, settings.INFERENCE_TILE_MAX_BATCH)
+        self.models = set(settings.INFERENCE_TILE_MODELS)
+        self._plans: Dict[tuple, TilePlan] = {}
+
+    def plan(self, camera_id: str, model: str, shape, regions=None, stride: int = 32) -> Optional[TilePlan]:
+        """TilePlan for this frame, or None to run the model on the full frame."""
+        large = bool(self.min_width) and shape[1] >= self.min_width and (not self.models or model in self.models)
+        if not regions and not large:
+            return None
+        tile = make_divisible(self.tile_size, stride)
+        key = (camera_id, tuple(shape[:2]), tile)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._plans[key] = plan_tiles(shape, tile, self.overlap, regions)
+            print(f"[SCHED] 🧩 Camera {camera_id}: {len(plan.tiles)} tiles of {tile}px for {shape[1]}x{shape[0]}"
+                  f"{' (ROI)' if regions else ''}")
+        return plan
+
+    def forget(self, camera_id: str):
+        for key in [k for k in self._plans if k[0] == camera_id]:
+            del self._plans[key]
+
+
+@torch.no_grad()
+def detect_tiled(model, frames: Sequence[np.ndarray], plans: Sequence[TilePlan], max_batch: int = 16) -> List[Detections]:
+    """
+    Tiled inference with an AutoShape model.
+
+    Every tile of every frame is padded to the tile size and the stack goes
+    through raw forwards of at most `max_batch` tiles each. Raw predictions
+    are shifted into frame coordinates, concatenated per frame and merged
+    across tiles with a single non_max_suppression call, using the model's
+    own NMS settings.
+    Detections centred outside the ROI mask are dropped.
+    """
+    dt = (Profile(), Profile(), Profile())
+    batch, owners, offsets = [], [], []
+    with dt[0]:
+        for i, (frame, plan) in enumerate(zip(frames, plans)):
+            t = plan.tile_size
+            for x1, y1, x2, y2 in plan.tiles.tolist():
+                tile = np.full((t, t, 3), 114, dtype=np.uint8)  # letterbox grey, as in training
+                tile[: y2 - y1, : x2 - x1] = frame[y1:y2, x1:x2]
+                batch.append(tile)
+                owners.append(i)
+                offsets.append((x1, y1))
+
+    if not batch:
+        empty = torch.zeros((0, 6))
+        return [Detections([f], [empty], ["image0.jpg"], dt, model.names, (0, 3, 0, 0)) for f in frames]
+
+    with dt[1]:
+        chunks = []
+        for k in range(0, len(batch), max_batch):
+            x = torch.from_numpy(np.ascontiguousarray(np.stack(batch[k: k + max_batch]).transpose((0, 3, 1, 2)))).float() / 255
+            y = model(x)  # AutoShape passes tensors straight to the model (device/dtype handled there)
+            chunks.append(y[0] if isinstance(y, (list, tuple)) else y)  # (tiles, anchors, 5 + nc), xywh in tile pixels
+        raw = torch.cat(chunks)
+
+    with dt[2]:
+        shift = torch.tensor(offsets, device=raw.device, dtype=raw.dtype)
+        raw[..., :2] += shift[:, None, :]
+        owners = torch.tensor(owners, device=raw.device)
+        out = []
+        for i, (frame, plan) in enumerate(zip(frames, plans)):
+            merged = raw[owners == i].reshape(1, -1, raw.shape[-1])
+            det = non_max_suppression(
+                merged,
+                model.conf,
+                model.iou,
+                model.classes,
+                model.agnostic,
+                model.multi_label,
+                max_det=model.max_det,
+            )[0]
+            clip_boxes(det[:, :4], frame.shape[:2])  # edge tiles were padded
+            if plan.mask is not None and len(det):
+                cx = ((det[:, 0] + det[:, 2]) / 2).long().clamp(0, frame.shape[1] - 1).cpu().numpy()
+                cy = ((det[:, 1] + det[:, 3]) / 2).long().clamp(0, frame.shape[0] - 1).cpu().numpy()
+                det = det[torch.from_numpy(plan.mask[cy, cx] > 0).to(det.device)]
+            out.append(Detections([frame], [det], ["image0.jpg"], dt, model.names, (len(batch), *x.shape[1:])))
+    return out
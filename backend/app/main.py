@@ -1,9 +1,15 @@
 from fastapi import FastAPI, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import get_settings
+from app.core.loop_bridge import get_loop_bridge
 from app.routers import auth, cameras, pipeline, anomalies, upload_detect, stream
 from app.features.pipeline import video_feed
 from app.routers import anomalies_ws  # ✅ Add WebSocket router
+from app.services.anomaly_writer import get_anomaly_writer
+from app.features.alerts.dispatcher import get_alert_dispatcher
+from app.features.pipeline.clip_recorder import get_clip_recorder
+from app.features.yolo.registry import get_model_registry
+import asyncio
 import warnings
 
 warnings.filterwarnings("ignore", category=FutureWarning)
@@ -20,6 +26,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ---------- Lifecycle ----------
+@app.on_event("startup")
+async def on_startup():
+    get_loop_bridge().attach(asyncio.get_running_loop())  # ✅ Threads reach async services through this loop
+    get_anomaly_writer().start()
+    get_alert_dispatcher().start()
+    get_model_registry().preload()  # ✅ Models load in the background; the server is up immediately
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await asyncio.to_thread(get_alert_dispatcher().stop)
+    await asyncio.to_thread(get_anomaly_writer().stop)
+    get_clip_recorder().stop()
+    get_loop_bridge().detach()
+
 @app.get("/")
 def root():
     return {"status": "running", "message": "Securo backend is live!"}
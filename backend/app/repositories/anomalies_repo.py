@@ -4,6 +4,7 @@ import gridfs
 import cloudinary
 import cloudinary.uploader
 from bson import ObjectId
+from pymongo.errors import BulkWriteError
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from app.db.mongo import get_db, get_sync_db
@@ -53,31 +54,31 @@ def anomalies_col():
     return get_db()["anomalies"]
 
 
-# ---------- SAVE ANOMALY IMAGE ----------
-async def save_anomaly_image(anomaly: Dict[str, Any], frame, camera: Dict[str, Any]) -> Optional[str]:
+# ---------- UPLOAD ANOMALY IMAGE (sync, thread-pool safe) ----------
+def upload_anomaly_image_sync(anomaly: Dict[str, Any], frame, camera: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Upload anomaly image to Cloudinary,
-    save optional copy in GridFS,
-    and insert metadata in MongoDB.
+    Encode frame, upload it to Cloudinary and keep an optional copy in GridFS.
+    Returns the anomaly document ready for insertion (not inserted yet).
+    Raises on Cloudinary failure so callers can retry.
     """
+    # Encode frame as JPEG
+    _, buffer = cv2.imencode(".jpg", frame)
+    image_bytes = io.BytesIO(buffer)
+
+    # Upload to Cloudinary
+    upload_result = cloudinary.uploader.upload(
+        image_bytes,
+        folder="ai-security/anomalies",
+        public_id=f"{camera.get('name','camera')}_{anomaly['label']}_{datetime.utcnow().timestamp()}",
+        resource_type="image",
+        overwrite=True
+    )
+
+    image_url = upload_result.get("secure_url")
+    print(f"[CLOUDINARY] ✅ Uploaded image: {image_url}")
+
+    # Save in GridFS (optional backup)
     try:
-        # Encode frame as JPEG
-        _, buffer = cv2.imencode(".jpg", frame)
-        image_bytes = io.BytesIO(buffer)
-
-        # Upload to Cloudinary
-        upload_result = cloudinary.uploader.upload(
-            image_bytes,
-            folder="ai-security/anomalies",
-            public_id=f"{camera.get('name','camera')}_{anomaly['label']}_{datetime.utcnow().timestamp()}",
-            resource_type="image",
-            overwrite=True
-        )
-
-        image_url = upload_result.get("secure_url")
-        print(f"[CLOUDINARY] ✅ Uploaded image: {image_url}")
-
-        # Save in GridFS (optional backup)
         fs = get_fs()
         metadata = {
             "camera_name": camera.get("name"),
@@ -90,51 +91,77 @@ async def save_anomaly_image(anomaly: Dict[str, Any], frame, camera: Dict[str, A
         }
         fs.put(image_bytes.getvalue(), **metadata)
         print("[DB] ✅ Image metadata saved to GridFS")
+    except Exception as e:
+        print(f"[DB] ⚠️ GridFS backup failed: {e}")
 
-        # Insert anomaly record in MongoDB (sync-safe for thread)
-        doc = {
-            "camera_name": camera.get("name", "Unknown"),
-            "camera_location": camera.get("location", "Unknown"),
-            "model": anomaly.get("model"),
-            "label": anomaly.get("label"),
-            "confidence": anomaly.get("confidence"),
-            "timestamp": datetime.utcnow(),
-            "image_url": image_url,
-        }
+    return build_anomaly_doc(anomaly, camera, image_url)
 
-        try:
-            # ✅ Use synchronous DB for thread-safe insert
-            sync_db = get_sync_db()
-            sync_db["anomalies"].insert_one(doc)
-            print("[DB] ✅ Anomaly record inserted successfully (sync mode)")
-
-            # ✅ Broadcast anomaly event via WebSocket
-            try:
-                from app.routers.anomalies_ws import notify_all_anomalies
-                import asyncio
-                asyncio.create_task(
-                    notify_all_anomalies({
-                        "event": "new_anomaly",
-                        "label": anomaly.get("label"),
-                        "model": anomaly.get("model"),
-                        "camera_name": camera.get("name", "Unknown"),
-                        "confidence": anomaly.get("confidence"),
-                        "image_url": image_url,
-                        "timestamp": datetime.utcnow().isoformat(),
-                    })
-                )
-                print("[WS] 🔊 Real-time anomaly broadcasted")
-            except Exception as e:
-                print(f"[WS] ❌ Failed to broadcast anomaly: {e}")
 
-        except Exception as e:
-            print(f"[ERROR] ❌ Failed to insert anomaly record: {e}")
+def build_anomaly_doc(anomaly: Dict[str, Any], camera: Dict[str, Any], image_url: Optional[str]) -> Dict[str, Any]:
+    return {
+        "camera_id": camera.get("id"),
+        "camera_name": camera.get("name", "Unknown"),
+        "camera_location": camera.get("location", "Unknown"),
+        "model": anomaly.get("model"),
+        "label": anomaly.get("label"),
+        "confidence": anomaly.get("confidence"),
+        "track_id": anomaly.get("track_id"),
+        "timestamp": datetime.utcnow(),
+        "image_url": image_url,
+        "clip_id": anomaly.get("clip_id"),
+        "clip_url": None,
+        "clip_status": "pending" if anomaly.get("clip_id") else None,
+    }
 
-        return image_url
 
-    except Exception as e:
-        print(f"[ERROR] ❌ Failed to save anomaly image or record: {e}")
-        return None
+# ---------- EVENT CLIPS (sync, clip-writer threads) ----------
+def upload_anomaly_clip_sync(path, anomaly: Dict[str, Any], camera: Dict[str, Any]) -> str:
+    """Upload a pre/post-event MP4 to Cloudinary and return its URL. Raises on failure."""
+    upload_result = cloudinary.uploader.upload(
+        str(path),
+        folder="ai-security/clips",
+        public_id=f"{camera.get('name','camera')}_{anomaly.get('label')}_{datetime.utcnow().timestamp()}",
+        resource_type="video",
+        overwrite=True
+    )
+    clip_url = upload_result.get("secure_url")
+    print(f"[CLOUDINARY] ✅ Uploaded clip: {clip_url}")
+    return clip_url
+
+
+def set_anomaly_clip_sync(clip_id: str, fields: Dict[str, Any]) -> bool:
+    """Attach clip fields to the anomaly created with `clip_id`. False if that document is not stored yet."""
+    res = get_sync_db()["anomalies"].update_one({"clip_id": clip_id}, {"$set": fields})
+    return res.matched_count > 0
+
+
+def insert_anomalies_sync(docs: List[Dict[str, Any]]) -> List[Any]:
+    """Insert a batch of anomaly documents with one insert_many (sync PyMongo, thread-safe)."""
+    if not docs:
+        return []
+    try:
+        res = get_sync_db()["anomalies"].insert_many(docs, ordered=False)
+        return res.inserted_ids
+    except BulkWriteError as e:
+        # ✅ Retry-safe: docs already inserted by an earlier attempt come back as duplicate keys
+        if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+            raise
+        return [d["_id"] for d in docs]
+
+
+def anomaly_event(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """WebSocket payload for a stored anomaly."""
+    return {
+        "event": "new_anomaly",
+        "id": str(doc["_id"]) if doc.get("_id") else None,
+        "label": doc.get("label"),
+        "model": doc.get("model"),
+        "camera_id": doc.get("camera_id"),
+        "camera_name": doc.get("camera_name", "Unknown"),
+        "confidence": doc.get("confidence"),
+        "image_url": doc.get("image_url"),
+        "timestamp": datetime.utcnow().isoformat(),
+    }
 
 
 # ---------- LIST ANOMALIES ----------
@@ -21,6 +21,15 @@ async def get_anomalies(limit: int = 50, skip: int = 0):
         raise HTTPException(status_code=500, detail=f"Failed to fetch anomalies: {e}")
 
 
+# ---------- PERSISTENCE METRICS ----------
+@router.get("/persistence/stats")
+async def get_persistence_stats():
+    """
+    📊 Queue depth, backpressure and throughput of the background anomaly writer
+    """
+    return anomalies_svc.persistence_stats_svc()
+
+
 # ---------- 2️⃣ FETCH IMAGE BY ID ----------
 @router.get("/{image_id}/image")
 async def get_anomaly_image(image_id: str):
@@ -1,28 +1,52 @@
+import json
+from typing import Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import List
+from app.core.loop_bridge import get_loop_bridge
+from app.core.ws_hub import get_ws_hub
 
 router = APIRouter(prefix="/ws", tags=["websocket"])
 
-active_connections: List[WebSocket] = []
 
 async def notify_all_anomalies(data: dict):
-    """Broadcast anomaly to all active WebSocket clients."""
-    for ws in active_connections:
-        try:
-            await ws.send_json(data)
-        except Exception:
-            continue
+    """Broadcast anomaly to all subscribed WebSocket clients."""
+    get_ws_hub().broadcast(data)
+
+
+def notify_anomalies_threadsafe(data: dict) -> bool:
+    """Broadcast from a worker thread via the server loop. Returns False if dropped."""
+    return get_loop_bridge().submit(notify_all_anomalies(data)) is not None
+
 
 @router.websocket("/anomalies")
-async def anomaly_ws(websocket: WebSocket):
-    """WebSocket endpoint for anomaly updates."""
+async def anomaly_ws(websocket: WebSocket, camera_id: Optional[str] = None, label: Optional[str] = None):
+    """
+    WebSocket endpoint for anomaly updates.
+    Optional comma-separated `camera_id` / `label` query params limit what the client receives;
+    clients can change them later by sending {"action": "subscribe", "camera_ids": [...], "labels": [...]}.
+    """
     await websocket.accept()
-    active_connections.append(websocket)
+    hub = get_ws_hub()
+    client = hub.register(websocket, cameras=camera_id, labels=label)
     print("🟢 WebSocket connected")
 
     try:
         while True:
-            await websocket.receive_text()  # keep alive
+            text = await websocket.receive_text()  # keep alive / subscription updates
+            try:
+                msg = json.loads(text)
+            except ValueError:
+                continue
+            if isinstance(msg, dict) and msg.get("action") == "subscribe":
+                client.subscribe(msg.get("camera_ids"), msg.get("labels"))
     except WebSocketDisconnect:
-        active_connections.remove(websocket)
         print("🔴 WebSocket disconnected")
+    except Exception as e:
+        print(f"[WS] ⚠️ WebSocket closed: {e}")
+    finally:
+        await hub.unregister(client)
+
+
+@router.get("/stats")
+async def ws_stats():
+    """Fan-out hub metrics (clients, queued, dropped, evicted)."""
+    return get_ws_hub().get_stats()
@@ -1,47 +1,61 @@
+from typing import Optional
+from bson import ObjectId
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from app.core.deps import require_admin
 from app.repositories import cameras_repo
 from app.features.pipeline.stream_manager import StreamManager
+from app.features.alerts.dispatcher import get_alert_dispatcher
 
 router = APIRouter(prefix="/pipeline", tags=["pipeline"])
 
 @router.post("/start")
-async def start_pipeline(current=Depends(require_admin)):
-    cam = await cameras_repo.get_active_for_owner(current["id"])
-    if not cam:
-        raise HTTPException(status_code=400, detail="No active camera found.")
+async def start_pipeline(camera_id: Optional[str] = None, current=Depends(require_admin)):
+    """Start detection for a camera. Without camera_id, the owner's active camera is used."""
+    if camera_id:
+        if not ObjectId.is_valid(camera_id):
+            raise HTTPException(status_code=404, detail="Camera not found")
+        cam = await cameras_repo.find_by_id(camera_id)
+        if not cam or cam.get("created_by") != current["id"]:
+            raise HTTPException(status_code=404, detail="Camera not found")
+    else:
+        cam = await cameras_repo.get_active_for_owner(current["id"])
+        if not cam:
+            raise HTTPException(status_code=400, detail="No active camera found.")
     sm = StreamManager.get_instance()
-    sm.start({"id": str(cam["_id"]), **cam})
-    return {"message": f"Pipeline started for camera {cam['name']}"}
+    # Opening the source and restarting workers blocks, keep it off the event loop
+    if not await run_in_threadpool(sm.start, {**cam, "id": str(cam["_id"])}):
+        raise HTTPException(status_code=500, detail="Unable to open camera source.")
+    return {"message": f"Pipeline started for camera {cam['name']}", "camera_id": str(cam["_id"])}
 
 @router.post("/stop")
-async def stop_pipeline(current=Depends(require_admin)):
+async def stop_pipeline(camera_id: Optional[str] = None, current=Depends(require_admin)):
+    """Stop detection for one camera, or for all cameras if camera_id is omitted."""
     sm = StreamManager.get_instance()
-    sm.stop()
-    return {"message": "Pipeline stopped"}
+    await run_in_threadpool(sm.stop, camera_id)
+    return {"message": f"Pipeline stopped for camera {camera_id}" if camera_id else "Pipeline stopped"}
 
 @router.post("/model/{model_name}/activate")
 async def activate_model(model_name: str):
-    """Activate a specific detection model (e.g., people, weapon, or fire)."""
+    """Activate a specific detection model (e.g., people, weapon, or fire). Loads it in the background if needed."""
     stream = StreamManager.get_instance()
-    if model_name not in ["people", "weapon", "fire" , "shoplifting", "crowd", "Accident" , "Vandalism"]:  # ✅ added fire
+    if model_name not in stream.registry.names:
         raise HTTPException(status_code=400, detail="Invalid model name")
 
-    if model_name not in stream.active_models:
-        stream.active_models.append(model_name)
-        print(f"[PIPELINE] ✅ Activated model: {model_name}")
-    return {"message": f"{model_name} model activated"}
+    state = stream.activate_model(model_name)
+    print(f"[PIPELINE] ✅ Activated model: {model_name} ({state})")
+    return {"message": f"{model_name} model activated", "state": state}
 
 
 @router.post("/model/{model_name}/deactivate")
 async def deactivate_model(model_name: str):
     """Deactivate a specific detection model."""
     stream = StreamManager.get_instance()
-    if model_name not in ["people", "weapon", "fire", "shoplifting", "crowd", "Accident", "Vandalism"]:  # ✅ added fire
+    if model_name not in stream.registry.names:
         raise HTTPException(status_code=400, detail="Invalid model name")
 
     if model_name in stream.active_models:
-        stream.active_models.remove(model_name)
+        stream.deactivate_model(model_name)
         print(f"[PIPELINE] 🛑 Deactivated model: {model_name}")
     return {"message": f"{model_name} model deactivated"}
 
@@ -59,11 +73,29 @@ async def deactivate_all_models():
     stream.deactivate_all_models()
     return {"message": "All models deactivated"}
 @router.get("/models/status")
-async def get_model_status():
-    """Return which models are active or inactive."""
+async def get_model_status(detail: bool = False):
+    """
+    Return which models are active or inactive.
+    With detail=true, also each model's load state (pending, loading, ready, failed).
+    """
     stream = StreamManager.get_instance()
-    all_models = ["people", "weapon", "fire", "shoplifting", "crowd", "Accident", "Vandalism"]  # ✅ added crowd
+    if not detail:
+        return {name: name in stream.active_models for name in stream.registry.names}
+
+    states = stream.registry.status()
     return {
-        name: name in stream.active_models
-        for name in all_models
+        name: {"active": name in stream.active_models, **states[name]}
+        for name in stream.registry.names
     }
+
+
+@router.get("/models/memory")
+async def get_model_memory():
+    """Resident bytes per loaded model against the configured memory budget."""
+    return StreamManager.get_instance().registry.memory()
+
+
+@router.get("/alerts/stats")
+async def get_alert_stats():
+    """Queue depth, coalescing and drop counters of the Telegram alert dispatcher."""
+    return get_alert_dispatcher().get_stats()
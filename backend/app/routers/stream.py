@@ -1,65 +1,64 @@
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
 from app.features.pipeline.stream_manager import StreamManager
-import time
+from app.features.pipeline.broadcaster import mjpeg_frames
 
 router = APIRouter(prefix="/stream", tags=["stream"])
 
 
-def generate_frames():
-    """
-    Generator function for MJPEG streaming.
-    Continuously yields frames from StreamManager.
-    """
-    sm = StreamManager.get_instance()
-    
-    while True:
-        frame_bytes = sm.get_latest_frame()
-        
-        if frame_bytes is not None:
-            # MJPEG format: multipart/x-mixed-replace with boundary
-            yield (
-                b'--frame\r\n'
-                b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n'
-            )
-        else:
-            # If no frame available, send a small delay
-            time.sleep(0.1)
+def _safe_camera_info(camera_info):
+    """Convert camera_info to JSON-safe format (remove ObjectId)"""
+    if not camera_info:
+        return None
+    return {
+        "id": camera_info.get("id"),
+        "name": camera_info.get("name"),
+        "location": camera_info.get("location"),
+        "source": camera_info.get("source"),
+        "is_active": camera_info.get("is_active")
+    }
 
 
 @router.get("/video_feed")
-async def video_feed():
+async def video_feed(camera_id: Optional[str] = None):
     """
     MJPEG video stream endpoint.
     Returns live camera feed with detection bounding boxes.
+    Without camera_id, the first running camera is streamed.
+    Frames are JPEG-encoded once per camera and shared by every viewer.
     """
+    sm = StreamManager.get_instance()
+    if camera_id and sm.get_stream(camera_id) is None:
+        raise HTTPException(status_code=404, detail="Camera stream not running")
+
     return StreamingResponse(
-        generate_frames(),
+        mjpeg_frames(sm, camera_id),
         media_type="multipart/x-mixed-replace; boundary=frame"
     )
 
 
 @router.get("/status")
-async def stream_status():
+async def stream_status(camera_id: Optional[str] = None):
     """
     Get current stream status.
-    Returns camera info and active state.
+    Returns camera info and active state of the selected camera plus all running cameras.
     """
     sm = StreamManager.get_instance()
-    
-    # Convert camera_info to JSON-safe format (remove ObjectId)
-    safe_camera_info = None
-    if sm.camera_info:
-        safe_camera_info = {
-            "name": sm.camera_info.get("name"),
-            "location": sm.camera_info.get("location"),
-            "source": sm.camera_info.get("source"),
-            "is_active": sm.camera_info.get("is_active")
-        }
-    
+    cam = sm.get_stream(camera_id)
+
     return {
-        "active": sm.active,
-        "camera_info": safe_camera_info,
+        "active": bool(cam and cam.active),
+        "camera_info": _safe_camera_info(cam.camera_info) if cam else None,
         "active_models": sm.active_models,
-        "has_frame": sm.latest_frame is not None
+        "has_frame": bool(cam and cam.latest_frame is not None),
+        "cameras": [
+            {
+                "camera_info": _safe_camera_info(c.camera_info),
+                "active": c.active,
+                "has_frame": c.latest_frame is not None,
+                "stats": c.get_stats(),
+            }
+            for c in sm.list_streams()
+        ],
     }
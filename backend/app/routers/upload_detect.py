@@ -5,6 +5,7 @@ import base64
 from pathlib import Path
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from app.features.pipeline.stream_manager import StreamManager
+from app.features.pipeline.renderer import Layer, get_renderer
 from app.core.config import get_settings
 
 settings = get_settings()
@@ -15,17 +16,12 @@ router = APIRouter(prefix="/upload", tags=["upload"])
 @router.post("/detect")
 async def detect_anomalies(file: UploadFile = File(...)):
     """
-    Accepts an image or video, stops camera if active,
-    runs YOLO detection on it using all active models.
+    Accepts an image or video and runs YOLO detection on it
+    using all active models. Live camera streams keep running.
     """
     try:
         sm = StreamManager.get_instance()
 
-        # 🛑 Stop camera stream if active
-        if sm.active:
-            sm.stop()
-            print("[UPLOAD] Camera stream stopped for manual detection.")
-
         # ✅ Check if at least one model is active
         if not sm.active_models or len(sm.active_models) == 0:
             raise HTTPException(
@@ -58,50 +54,28 @@ async def detect_anomalies(file: UploadFile = File(...)):
         frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
 
         # Run all loaded models (use only active ones)
+        layers = []
         for model_name in sm.active_models:
-            model = sm.models.get(model_name)
+            model = sm.get_model(model_name)
             if not model:
                 continue
 
             results = model(frame_rgb)
-            df = results.pandas().xyxy[0]
-
-            for _, det in df.iterrows():
-                label = det["name"]
-                conf = float(det["confidence"])
-                threshold = settings.MODEL_THRESHOLDS.get(model_name, settings.MODEL_THRESHOLDS["default"])
-                if conf < threshold:
-                    continue
+            threshold = settings.MODEL_THRESHOLDS.get(model_name, settings.MODEL_THRESHOLDS["default"])
+            dets = results.numpy()[0]
+            dets = dets[dets["conf"] >= threshold]
 
+            for (x1, y1, x2, y2), conf, cls in zip(dets["xyxy"].astype(int).tolist(), dets["conf"].tolist(), dets["cls"].tolist()):
                 detections.append({
                     "model": model_name,
-                    "label": label,
+                    "label": results.names[cls],
                     "confidence": conf,
-                    "bbox": [
-                        int(det["xmin"]),
-                        int(det["ymin"]),
-                        int(det["xmax"]),
-                        int(det["ymax"])
-                    ]
+                    "bbox": [x1, y1, x2, y2]
                 })
+            layers.append(Layer.from_dets(model_name, results.names, dets))
 
-                # Draw bounding box
-                cv2.rectangle(
-                    frame,
-                    (int(det["xmin"]), int(det["ymin"])),
-                    (int(det["xmax"]), int(det["ymax"])),
-                    (0, 255, 0),
-                    2
-                )
-                cv2.putText(
-                    frame,
-                    f"{label} {conf:.2f}",
-                    (int(det["xmin"]), max(int(det["ymin"]) - 10, 20)),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.6,
-                    (0, 255, 0),
-                    2
-                )
+        # 🎨 Same renderer (and per-model colors) as the live streams
+        get_renderer().render(frame, layers)
 
         # Convert final frame to Base64
         _, buffer = cv2.imencode(".jpg", frame)
@@ -1,12 +1,24 @@
 from typing import Dict, Any
 from app.repositories import anomalies_repo
+from app.services.anomaly_writer import get_anomaly_writer
+from app.core.loop_bridge import get_loop_bridge
+from app.features.pipeline.clip_recorder import get_clip_recorder
 
 
-async def create_anomaly_svc(anomaly: Dict[str, Any], frame, camera: Dict[str, Any]):
+def submit_anomaly_svc(anomaly: Dict[str, Any], frame, camera: Dict[str, Any]) -> bool:
     """
-    Handles Cloudinary upload + MongoDB insert.
+    Queue an anomaly for background persistence (safe to call from camera threads).
+    Returns False if the persistence queue is full.
     """
-    await anomalies_repo.save_anomaly_image(anomaly, frame, camera)
+    return get_anomaly_writer().submit(anomaly, frame, camera)
+
+
+def persistence_stats_svc() -> Dict[str, Any]:
+    """Backpressure / throughput metrics of the anomaly writer, the loop bridge and the clip recorder"""
+    stats = get_anomaly_writer().get_stats()
+    stats["loop_bridge"] = get_loop_bridge().get_stats()
+    stats["clips"] = get_clip_recorder().get_stats()
+    return stats
 
 
 async def list_anomalies_svc(limit: int = 50, skip: int = 0):
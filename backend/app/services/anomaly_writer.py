@@ -0,0 +1,200 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from app.core.config import get_settings
+from app.repositories import anomalies_repo
+
+
+class AnomalyWriter:
+    """
+    Background persistence for anomaly events.
+
+    Camera threads call submit(), which never blocks: events go into a
+    bounded queue (rejected and counted when full). A worker thread hands
+    image uploads to a thread pool with a bounded number in flight, collects
+    the resulting documents and writes them with insert_many in batches.
+    Uploads and inserts are retried with exponential backoff.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.queue: "queue.Queue" = queue.Queue(maxsize=settings.PERSIST_QUEUE_SIZE)
+        self.batch_size = settings.PERSIST_BATCH_SIZE
+        self.flush_interval = settings.PERSIST_FLUSH_MS / 1000.0
+        self.max_retries = settings.PERSIST_MAX_RETRIES
+        self.retry_base = settings.PERSIST_RETRY_BASE_SECONDS
+
+        self.pool = ThreadPoolExecutor(max_workers=settings.PERSIST_UPLOAD_WORKERS, thread_name_prefix="anomaly-upload")
+        self.max_inflight = settings.PERSIST_UPLOAD_WORKERS * 2
+        self._inflight = threading.BoundedSemaphore(self.max_inflight)
+        self._docs: List[Dict[str, Any]] = []
+        self._docs_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+        self.active = False
+        self.closed = False
+        self.thread: Optional[threading.Thread] = None
+
+        self.stats = {
+            "accepted": 0,
+            "rejected": 0,
+            "queue_high_watermark": 0,
+            "inflight": 0,
+            "uploaded": 0,
+            "upload_failures": 0,
+            "inserted": 0,
+            "insert_failures": 0,
+            "batches": 0,
+            "retries": 0,
+            "notify_dropped": 0,
+        }
+
+    # ---------- Lifecycle ----------
+    def start(self):
+        if self.active:
+            return
+        self.active = True
+        self.thread = threading.Thread(target=self._run, name="anomaly-writer", daemon=True)
+        self.thread.start()
+        print("[PERSIST] 🚀 Anomaly writer started.")
+
+    def stop(self, timeout: float = 10.0):
+        """Stop accepting work and flush what is already queued."""
+        self.closed = True
+        self.active = False
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=timeout)
+        self.pool.shutdown(wait=True)
+        self._flush()
+        print("[PERSIST] 🛑 Anomaly writer stopped.")
+
+    # ---------- Producer API ----------
+    def submit(self, anomaly: Dict[str, Any], frame, camera: Dict[str, Any]) -> bool:
+        """Queue an anomaly for persistence. Never blocks; returns False if the queue is full."""
+        if self.closed:
+            return False
+        if not self.active:
+            self.start()
+        try:
+            self.queue.put_nowait((anomaly, frame, camera))
+        except queue.Full:
+            self._bump("rejected")
+            print(f"[PERSIST] ⚠️ Queue full — dropped anomaly {anomaly.get('label')}")
+            return False
+
+        depth = self.queue.qsize()
+        with self._lock:
+            self.stats["accepted"] += 1
+            self.stats["queue_high_watermark"] = max(self.stats["queue_high_watermark"], depth)
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        with self._docs_lock:
+            stats["pending_docs"] = len(self._docs)
+        stats["queue_depth"] = self.queue.qsize()
+        stats["queue_maxsize"] = self.queue.maxsize
+        return stats
+
+    # ---------- Worker ----------
+    def _run(self):
+        last_flush = time.time()
+        while self.active or not self.queue.empty():
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+
+            if item is not None:
+                # ✅ Backpressure: wait for an upload slot instead of growing the pool's queue
+                self._inflight.acquire()
+                self._bump("inflight")
+                self.pool.submit(self._upload, item)
+
+            with self._docs_lock:
+                pending = len(self._docs)
+            if pending >= self.batch_size or (pending and time.time() - last_flush >= self.flush_interval):
+                self._flush()
+                last_flush = time.time()
+
+        # Let in-flight uploads land before the final flush
+        for _ in range(self.max_inflight):
+            self._inflight.acquire()
+        for _ in range(self.max_inflight):
+            self._inflight.release()
+        self._flush()
+
+    def _upload(self, item):
+        anomaly, frame, camera = item
+        try:
+            try:
+                doc = self._retry(anomalies_repo.upload_anomaly_image_sync, anomaly, frame, camera)
+                self._bump("uploaded")
+            except Exception as e:
+                # Keep the record even if the image could not be stored
+                print(f"[PERSIST] ❌ Image upload failed permanently: {e}")
+                self._bump("upload_failures")
+                doc = anomalies_repo.build_anomaly_doc(anomaly, camera, None)
+            with self._docs_lock:
+                self._docs.append(doc)
+        finally:
+            self._bump("inflight", -1)
+            self._inflight.release()
+
+    def _flush(self):
+        with self._docs_lock:
+            docs, self._docs = self._docs, []
+        if not docs:
+            return
+
+        try:
+            self._retry(anomalies_repo.insert_anomalies_sync, docs)
+        except Exception as e:
+            print(f"[PERSIST] ❌ insert_many of {len(docs)} anomalies failed permanently: {e}")
+            self._bump("insert_failures", len(docs))
+            return
+
+        self._bump("inserted", len(docs))
+        self._bump("batches")
+        print(f"[DB] ✅ Inserted {len(docs)} anomaly record(s)")
+        for doc in docs:
+            self._notify(doc)
+
+    def _retry(self, fn, *args):
+        delay = self.retry_base
+        for attempt in range(self.max_retries + 1):
+            try:
+                return fn(*args)
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                self._bump("retries")
+                print(f"[PERSIST] 🔁 {fn.__name__} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    def _notify(self, doc: Dict[str, Any]):
+        """Broadcast the stored anomaly via WebSocket on the server loop."""
+        from app.routers.anomalies_ws import notify_anomalies_threadsafe
+        if not notify_anomalies_threadsafe(anomalies_repo.anomaly_event(doc)):
+            self._bump("notify_dropped")
+
+    def _bump(self, key: str, n: int = 1):
+        with self._lock:
+            self.stats[key] += n
+
+
+_writer: Optional[AnomalyWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_anomaly_writer() -> AnomalyWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AnomalyWriter()
+    return _writer
@@ -0,0 +1,59 @@
+import json
+import os
+
+import pytest
+
+# Settings has required fields with no defaults; tests never talk to Mongo or issue tokens
+os.environ.setdefault("MONGO_URI", "mongodb://127.0.0.1:27017")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+
+from app.core.config import get_settings  # noqa: E402
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    """settings(NAME=value, ...) overrides settings through the environment and returns the fresh Settings."""
+
+    def apply(**overrides):
+        for key, value in overrides.items():
+            monkeypatch.setenv(key, json.dumps(value) if isinstance(value, (dict, list)) else str(value))
+        get_settings.cache_clear()
+        return get_settings()
+
+    yield apply
+    get_settings.cache_clear()
+
+
+@pytest.fixture(scope="session")
+def tiny_weights(tmp_path_factory):
+    """A randomly initialised two-class YOLOv5n checkpoint in the format torch.hub 'custom' loads."""
+    import torch
+    from app.features.yolo.loader import ensure_yolov5_path
+
+    ensure_yolov5_path()
+    from models.yolo import DetectionModel
+
+    torch.manual_seed(0)
+    model = DetectionModel(os.path.join(ensure_yolov5_path(), "models", "yolov5n.yaml"), nc=2)
+    model.names = {0: "person", 1: "gun"}
+    path = tmp_path_factory.mktemp("weights") / "tiny.pt"
+    torch.save({"model": model}, path)
+    return path
+
+
+@pytest.fixture
+def make_detections():
+    """make_detections([[x1, y1, x2, y2, conf, cls], ...]) -> a one-image YOLOv5 Detections, as AutoShape returns."""
+    import numpy as np
+    import torch
+    from app.features.yolo.loader import ensure_yolov5_path
+    ensure_yolov5_path()
+    from models.common import Detections
+    from utils.general import Profile
+
+    def make(rows, shape=(480, 640), names=None):
+        pred = torch.tensor(rows, dtype=torch.float32).reshape(-1, 6)
+        im = np.zeros((*shape, 3), dtype=np.uint8)
+        return Detections([im], [pred], ["image0.jpg"], (Profile(), Profile(), Profile()),
+                          names or {0: "person", 1: "gun"}, (1, 3, *shape))
+    return make
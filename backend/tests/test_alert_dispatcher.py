@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+import telebot
+from telebot import apihelper
+
+from app.features.alerts.dispatcher import AlertDispatcher
+
+MESSAGE = {"message_id": 1, "date": 0, "chat": {"id": 42, "type": "private"}}
+
+
+class FakeTelegram(BaseHTTPRequestHandler):
+    """Minimal Bot API: records every call and answers like Telegram does."""
+
+    calls = []
+    gate = None  # threading.Event the handler waits on, to hold the dispatcher inside a send
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if type(self).gate is not None:
+            type(self).gate.wait(5)
+        method = self.path.split("?")[0].rsplit("/", 1)[-1]
+        type(self).calls.append((method, time.monotonic()))
+        result = [MESSAGE] if method == "sendMediaGroup" else MESSAGE
+        body = json.dumps({"ok": True, "result": result}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    FakeTelegram.calls = []
+    FakeTelegram.gate = None
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeTelegram)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    monkeypatch.setattr(apihelper, "API_URL", f"http://127.0.0.1:{httpd.server_address[1]}/bot{{0}}/{{1}}")
+    yield FakeTelegram
+    if FakeTelegram.gate is not None:
+        FakeTelegram.gate.set()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def make_dispatcher(settings):
+    dispatchers = []
+
+    def make(**overrides):
+        settings(**{"ALERT_COALESCE_SECONDS": 0.2, "TELEGRAM_RATE_PER_SEC": 100, "TELEGRAM_BURST": 10, **overrides})
+        d = AlertDispatcher(bot=telebot.TeleBot("123:test", threaded=False), chat_id="42")
+        dispatchers.append(d)
+        return d
+
+    yield make
+    for d in dispatchers:
+        d.stop()
+
+
+def _alert(label="gun", conf=0.9):
+    return {"model": "weapon", "label": label, "confidence": conf, "timestamp": "2026-01-01 00:00:00"}
+
+
+FRAME = np.zeros((48, 64, 3), dtype=np.uint8)
+CAMERA = {"id": "cam1", "name": "Gate", "location": "North"}
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_burst_is_coalesced_into_one_media_group(telegram, make_dispatcher):
+    d = make_dispatcher()
+    for conf in (0.86, 0.95, 0.9):
+        assert d.submit(_alert(conf=conf), FRAME, CAMERA)
+
+    assert _wait_for(lambda: d.get_stats()["messages_sent"] == 1)
+    time.sleep(0.3)  # nothing else goes out for the same burst
+    assert [m for m, _ in telegram.calls] == ["sendMediaGroup"]
+    stats = d.get_stats()
+    assert stats["coalesced"] == 2
+    assert stats["photos_sent"] == 3
+
+
+def test_single_alert_is_sent_as_photo(telegram, make_dispatcher):
+    d = make_dispatcher()
+    d.submit(_alert(), FRAME, CAMERA)
+    assert _wait_for(lambda: d.get_stats()["messages_sent"] == 1)
+    assert [m for m, _ in telegram.calls] == ["sendPhoto"]
+
+
+def test_token_bucket_throttles_sends(telegram, make_dispatcher):
+    d = make_dispatcher(ALERT_COALESCE_SECONDS=0.05, TELEGRAM_RATE_PER_SEC=5, TELEGRAM_BURST=1)
+    for label in ("gun", "knife", "fire"):  # different labels are separate messages
+        d.submit(_alert(label=label), FRAME, CAMERA)
+
+    assert _wait_for(lambda: d.get_stats()["messages_sent"] == 3)
+    times = [t for _, t in telegram.calls]
+    gaps = np.diff(times)
+    assert (gaps >= 0.15).all(), gaps  # 5/s with no burst allowance: ~0.2s apart
+    assert d.get_stats()["rate_limited_seconds"] > 0.3
+
+
+def test_queue_depth_and_drops_are_reported(telegram, make_dispatcher):
+    telegram.gate = threading.Event()
+    d = make_dispatcher(ALERT_COALESCE_SECONDS=0.0, ALERT_QUEUE_SIZE=2)
+
+    d.submit(_alert(label="first"), FRAME, CAMERA)
+    assert _wait_for(lambda: d.get_stats()["queue_depth"] == 0 and d.get_stats()["open_bursts"] == 0)
+    # The worker is now stuck inside the first send, so the queue only fills up
+    results = [d.submit(_alert(label=f"l{i}"), FRAME, CAMERA) for i in range(3)]
+
+    assert results == [True, True, False]
+    stats = d.get_stats()
+    assert stats["queue_depth"] == 2
+    assert stats["queue_maxsize"] == 2
+    assert stats["accepted"] == 3
+    assert stats["dropped"] == 1
+
+    telegram.gate.set()
+    assert _wait_for(lambda: d.get_stats()["messages_sent"] == 3)
+    assert d.get_stats()["queue_depth"] == 0
@@ -0,0 +1,64 @@
+import pytest
+
+from app.features.pipeline.cadence import ModelCadence
+
+
+@pytest.fixture
+def cadence(settings):
+    settings(MODEL_TARGET_HZ={"people": 10, "crowd": 1, "default": 0},
+             MODEL_PRIORITIES={"weapon": 10, "people": 8, "crowd": 1, "default": 5},
+             INFERENCE_CPU_BUDGET=0.85, INFERENCE_MIN_RATE_SCALE=0.25)
+    return ModelCadence()
+
+
+def test_model_is_due_once_per_interval(cadence):
+    assert cadence.is_due("cam1", "people", 100.0)  # never ran
+    cadence.record("cam1", "people", 100.0, "r1")
+
+    assert not cadence.is_due("cam1", "people", 100.05)
+    assert cadence.is_due("cam1", "people", 100.11)  # 10 Hz
+    assert cadence.is_due("cam2", "people", 100.05)  # per camera
+
+
+def test_every_frame_model_is_always_due(cadence):
+    cadence.record("cam1", "weapon", 100.0, "r1")
+    assert cadence.is_due("cam1", "weapon", 100.0)
+
+
+def test_skipped_frames_carry_the_last_result_forward(cadence):
+    cadence.record("cam1", "crowd", 100.0, "first")
+    assert not cadence.is_due("cam1", "crowd", 100.5)
+    assert cadence.last_result("cam1", "crowd") == "first"
+
+    cadence.record("cam1", "crowd", 101.0, "second")
+    assert cadence.last_result("cam1", "crowd") == "second"
+
+
+def test_forget_drops_carried_results(cadence):
+    for cam in ("cam1", "cam2"):
+        cadence.record(cam, "people", 100.0, f"{cam}-people")
+        cadence.record(cam, "crowd", 100.0, f"{cam}-crowd")
+
+    cadence.forget("cam1", "crowd")
+    assert cadence.last_result("cam1", "crowd") is None
+    assert cadence.is_due("cam1", "crowd", 100.0)
+    assert cadence.last_result("cam1", "people") == "cam1-people"
+
+    cadence.forget("cam1")
+    assert cadence.last_result("cam1", "people") is None
+    assert cadence.last_result("cam2", "people") == "cam2-people"  # other cameras keep theirs
+
+
+def test_over_budget_slows_lowest_priority_model_first(cadence):
+    cadence.record("cam1", "people", 100.0, None)
+    cadence.record("cam1", "crowd", 100.0, None)
+
+    cadence.utilization = 0.95
+    cadence.observe(busy=0.1, cycle_start=100.0)
+    assert cadence.scale == {"people": 1.0, "crowd": 0.5}
+    assert cadence.interval("crowd") == pytest.approx(2.0)
+
+    cadence.utilization = 0.1
+    cadence._last_adjust = 0.0
+    cadence.observe(busy=0.01, cycle_start=100.0)
+    assert cadence.scale["crowd"] == 1.0
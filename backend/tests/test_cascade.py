@@ -0,0 +1,65 @@
+import pytest
+
+from app.features.pipeline.cascade import ModelCascade
+
+RULES = {"weapon": {"requires": "people", "min_conf": 0.5, "window_frames": 3}}
+PERSON = [100, 100, 200, 300, 0.9, 0]
+RUNNING = {"people", "weapon"}
+
+
+@pytest.fixture
+def cascade(settings):
+    settings()
+    return ModelCascade(RULES)
+
+
+def _frame(cascade, make_detections, rows, cam="cam1"):
+    cascade.tick(cam)
+    cascade.observe(cam, "people", make_detections(rows))
+
+
+def test_triggers_run_first(cascade):
+    assert cascade.order(["weapon", "fire", "people"]) == ["people", "weapon", "fire"]
+
+
+def test_specialist_is_blocked_until_trigger_fires(cascade, make_detections):
+    _frame(cascade, make_detections, [])
+    assert not cascade.allows("cam1", "weapon", RUNNING)
+
+    _frame(cascade, make_detections, [[*PERSON[:4], 0.3, 0]])  # below min_conf
+    assert not cascade.allows("cam1", "weapon", RUNNING)
+
+    _frame(cascade, make_detections, [PERSON])
+    assert cascade.allows("cam1", "weapon", RUNNING)
+    assert not cascade.allows("cam2", "weapon", RUNNING)  # per camera
+    assert cascade.get_stats()["models"]["weapon"] == {"ran": 1, "skipped": 3, "crops": 0}
+
+
+def test_gate_closes_after_the_window(cascade, make_detections):
+    _frame(cascade, make_detections, [PERSON])
+    for _ in range(2):
+        _frame(cascade, make_detections, [])
+        assert cascade.allows("cam1", "weapon", RUNNING)
+    _frame(cascade, make_detections, [])  # the person is now 3 frames old
+    assert not cascade.allows("cam1", "weapon", RUNNING)
+
+
+def test_ungated_models_and_missing_trigger_are_not_blocked(cascade):
+    assert cascade.allows("cam1", "fire", RUNNING)
+    assert cascade.allows("cam1", "weapon", {"weapon"})  # people not running: weapon is not held back
+
+
+def test_forget_closes_the_gate(cascade, make_detections):
+    _frame(cascade, make_detections, [PERSON])
+    cascade.forget("cam1")
+    assert not cascade.allows("cam1", "weapon", RUNNING)
+
+
+def test_roi_crops_around_trigger_boxes(settings, make_detections):
+    settings()
+    cascade = ModelCascade({"weapon": {**RULES["weapon"], "roi_crops": True, "roi_pad": 0.0, "roi_min_size": 1}})
+    assert cascade.rois("cam1", "weapon", (480, 640, 3)) is None
+
+    _frame(cascade, make_detections, [PERSON])
+    rois = cascade.rois("cam1", "weapon", (480, 640, 3))
+    assert rois.tolist() == [[100, 100, 200, 300]]
@@ -0,0 +1,65 @@
+import shutil
+
+import numpy as np
+import pytest
+import torch
+
+from app.features.yolo import loader
+
+
+@pytest.fixture
+def model_root(tmp_path, tiny_weights, settings, monkeypatch):
+    """MODEL_ROOT with one checkpoint, compiled cache under tmp_path, in-process cache empty."""
+    root = tmp_path / "ai_models"
+    root.mkdir()
+    shutil.copy(tiny_weights, root / "tiny.pt")
+    monkeypatch.setattr(loader, "MODEL_ROOT", root)
+    monkeypatch.setattr(loader, "_cache", {})
+    settings(MODEL_ARTIFACT_DIR=str(tmp_path / "artifacts"), MODEL_COMPILED_CACHE=True,
+             MODEL_PREFER_QUANTIZED=False, MODEL_BACKENDS={"default": "pt"})
+    return root
+
+
+def _frames():
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (360, 640, 3), dtype=np.uint8), rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)]
+
+
+def test_warm_load_matches_cold_load(model_root, monkeypatch):
+    from models.common import DetectMultiBackend
+
+    cold = loader.load_model("tiny.pt")
+    entry = loader.compiled_path(model_root / "tiny.pt", loader._default_device())
+    assert entry.exists()
+
+    # Restart: nothing in memory, and torch.hub must not be needed
+    monkeypatch.setattr(loader, "_cache", {})
+    monkeypatch.setattr(torch.hub, "load", lambda *a, **k: pytest.fail("warm start went through torch.hub"))
+    warm = loader.load_model("tiny.pt")
+
+    assert warm is not cold
+    assert isinstance(warm.model, DetectMultiBackend)
+    assert (warm.dmb, warm.pt) == (cold.dmb, cold.pt) == (True, True)
+    assert isinstance(warm.stride, int) and warm.stride == cold.stride
+    assert warm.names == cold.names
+
+    for m in (cold, warm):
+        m.conf = 0.001  # random weights: keep low-confidence boxes so there is something to compare
+    frames = _frames()
+    cold_pred, warm_pred = cold(frames).pred, warm(frames).pred
+    assert sum(len(p) for p in cold_pred) > 0
+    for a, b in zip(cold_pred, warm_pred):
+        torch.testing.assert_close(a, b)
+
+
+def test_old_format_cache_entry_is_rebuilt(model_root, monkeypatch):
+    weights = model_root / "tiny.pt"
+    cold = loader.load_model("tiny.pt")
+    entry = loader.compiled_path(weights, loader._default_device())
+    torch.save(cold.model.model, entry)  # what earlier versions stored: the bare DetectionModel
+
+    assert loader.load_compiled(weights) is None
+
+    monkeypatch.setattr(loader, "_cache", {})
+    loader.load_model("tiny.pt")  # cold path again, rewrites the entry
+    assert loader.load_compiled(weights) is not None
@@ -0,0 +1,100 @@
+import gc
+import time
+import weakref
+
+import pytest
+import torch
+
+from app.features.yolo import registry as registry_module
+from app.features.yolo.loader import ensure_yolov5_path
+from app.features.yolo.registry import EVICTED, READY, ModelRegistry, model_bytes
+
+FILES = {"a": "a.pt", "b": "b.pt", "c": "c.pt"}
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def fake_models(tiny_weights, monkeypatch):
+    """load_model replacement: the tiny checkpoint as AutoShape(DetectMultiBackend), with a different Detect head per file."""
+    ensure_yolov5_path()
+    from models.common import AutoShape, DetectMultiBackend
+
+    loaded = {}
+
+    def load(filename):
+        model = AutoShape(DetectMultiBackend(str(tiny_weights), device=torch.device("cpu")), verbose=False)
+        with torch.no_grad():
+            for p in model.model.model.model[-1].parameters():
+                p.add_((sum(map(ord, filename)) % 7 + 1) / 100)  # shared backbone/neck, task-specific head
+        loaded[filename] = model
+        return model
+
+    monkeypatch.setattr(registry_module, "load_model", load)
+    monkeypatch.setattr(registry_module, "unload_model", lambda filename: loaded.pop(filename, None))
+    return load
+
+
+@pytest.fixture
+def budget(fake_models, settings):
+    """Budget that holds two of the three models; loads run one at a time in submit order."""
+    size = model_bytes(fake_models("probe.pt"))
+    return settings(MODEL_MEMORY_BUDGET_MB=2.5 * size / MB, MODEL_LOAD_WORKERS=1)
+
+
+def _load_all(registry):
+    for name in registry.names:
+        registry.ensure(name).result(timeout=60)
+        time.sleep(0.01)  # distinct last_used stamps
+
+
+def test_budget_evicts_least_recently_used_inactive_model(budget):
+    registry = ModelRegistry(FILES)
+    registry.set_active_provider(lambda: ["b", "c"])
+    _load_all(registry)
+
+    assert registry.state("a") == EVICTED  # oldest idle model goes first
+    assert sorted(registry.models) == ["b", "c"]
+    assert registry.resident_bytes() <= registry.budget_bytes
+    assert registry.memory()["evictions"] == 1
+
+    registry.set_active_provider(lambda: ["a"])
+    registry.get("b")  # c is now the least recently used idle model
+    registry.ensure("a").result(timeout=60)
+    assert registry.state("c") == EVICTED
+    assert sorted(registry.models) == ["a", "b"]
+
+
+def test_active_models_are_never_evicted(budget):
+    registry = ModelRegistry(FILES)
+    _load_all(registry)  # default provider: everything is active
+
+    assert all(registry.state(n) == READY for n in FILES)
+    assert registry.evictions == 0
+
+
+def test_shared_mode_drops_evicted_heads(budget, settings, monkeypatch):
+    from app.features.pipeline import stream_manager
+
+    settings(MODEL_LOADER_MODE="shared")
+    registry = ModelRegistry(FILES)
+    monkeypatch.setattr(stream_manager, "get_model_registry", lambda: registry)
+
+    manager = stream_manager.StreamManager()
+    for name in FILES:
+        registry.ensure(name).result(timeout=60)
+    assert manager.multihead is not None and sorted(manager.multihead.heads) == ["a", "b", "c"]
+
+    head = weakref.ref(registry.models["a"].model.model.model[-1])
+    manager.deactivate_model("a")
+    manager.deactivate_model("b")
+    registry.budget_bytes = 1  # only the active model may stay
+    registry.enforce_budget()
+
+    assert sorted(registry.models) == ["c"]
+    assert manager.multihead.heads == ["c"]
+    gc.collect()
+    assert head() is None  # the evicted head's layers are really released
+
+    manager.activate_model("a")
+    registry.ensure("a").result(timeout=60)
+    assert sorted(manager.multihead.heads) == ["a", "c"]  # reloaded head joins the composite again
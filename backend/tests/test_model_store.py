@@ -0,0 +1,101 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from app.features.yolo import model_store
+from app.features.yolo.model_store import ModelStore, ModelStoreError
+
+PAYLOAD = bytes(range(256)) * 4096  # 1 MiB
+DIGEST = hashlib.sha256(PAYLOAD).hexdigest()
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD with Range support; the first full GET is cut off halfway."""
+
+    requests = []
+    cut_first = True
+
+    def do_GET(self):
+        rng = self.headers.get("Range")
+        type(self).requests.append(rng)
+        start = int(rng.split("=")[1].rstrip("-")) if rng else 0
+        body = PAYLOAD[start:]
+
+        self.send_response(206 if rng else 200)
+        if rng:
+            self.send_header("Content-Range", f"bytes {start}-{len(PAYLOAD) - 1}/{len(PAYLOAD)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not rng and type(self).cut_first:
+            type(self).cut_first = False
+            self.wfile.write(body[: len(body) // 2])  # connection drops mid-download
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    RangeHandler.requests = []
+    RangeHandler.cut_first = True
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/weapon.pt"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _settings(digests):
+    return SimpleNamespace(MODEL_STORE_DIR=None, MODEL_DOWNLOAD_TIMEOUT=5, MODEL_DOWNLOAD_RETRIES=2, MODEL_SHA256=digests)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(model_store.time, "sleep", lambda s: None)
+
+
+def test_interrupted_download_resumes_with_range(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(model_store, "get_settings", lambda: _settings({"weapon.pt": DIGEST}))
+    store = ModelStore(tmp_path)
+
+    path = store.fetch("weapon.pt", server)
+
+    assert path == store.blob_path(DIGEST, "weapon.pt")
+    assert path.read_bytes() == PAYLOAD
+    assert RangeHandler.requests[0] is None
+    assert RangeHandler.requests[1] == f"bytes={len(PAYLOAD) // 2}-"  # picked up where the cut left off
+    assert not list((tmp_path / "partial").iterdir())
+    assert store.lookup("weapon.pt") == path
+
+
+def test_existing_partial_file_is_resumed(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(model_store, "get_settings", lambda: _settings({"weapon.pt": DIGEST}))
+    store = ModelStore(tmp_path)
+    part = tmp_path / "partial" / f"weapon.pt.{DIGEST}.part"
+    part.parent.mkdir(parents=True)
+    part.write_bytes(PAYLOAD[:1000])
+
+    path = store.fetch("weapon.pt", server)
+
+    assert RangeHandler.requests == ["bytes=1000-"]
+    assert path.read_bytes() == PAYLOAD
+
+
+def test_checksum_mismatch_is_rejected(server, tmp_path, monkeypatch):
+    wrong = hashlib.sha256(b"other weights").hexdigest()
+    monkeypatch.setattr(model_store, "get_settings", lambda: _settings({"weapon.pt": wrong}))
+    store = ModelStore(tmp_path)
+
+    with pytest.raises(ModelStoreError, match="checksum mismatch"):
+        store.fetch("weapon.pt", server)
+
+    assert store.lookup("weapon.pt") is None
+    assert not (tmp_path / "partial" / f"weapon.pt.{wrong}.part").exists()  # bad data is not resumed later
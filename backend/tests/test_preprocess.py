@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+import torch
+
+from app.features.yolo.loader import ensure_yolov5_path
+from app.features.yolo.preprocess import FramePreprocessor, detect_prepared, model_input
+
+
+@pytest.fixture(params=["DetectionModel", "DetectMultiBackend"])
+def model(request, tiny_weights):
+    """The tiny checkpoint behind both AutoShape wrappers the app serves (warm start / torch.hub)."""
+    ensure_yolov5_path()
+    from models.common import AutoShape, DetectMultiBackend
+
+    if request.param == "DetectionModel":
+        inner = torch.load(tiny_weights, map_location="cpu", weights_only=False)["model"].float().fuse().eval()
+    else:
+        inner = DetectMultiBackend(str(tiny_weights), device=torch.device("cpu"))
+    model = AutoShape(inner, verbose=False)
+    model.conf = 0.001  # random weights: keep low-confidence boxes so there is something to compare
+    return model
+
+
+def _frames():
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (360, 640, 3), dtype=np.uint8), rng.integers(0, 255, (360, 640, 3), dtype=np.uint8)]
+
+
+def test_model_input_stride_is_an_int(model):
+    device, dtype, stride = model_input(model)
+    assert (device, dtype) == (torch.device("cpu"), torch.float32)
+    assert type(stride) is int and stride == 32
+
+
+def test_detect_prepared_matches_autoshape(model):
+    frames = _frames()  # BGR, as the scheduler hands them over
+    _, _, stride = model_input(model)
+
+    prepared = detect_prepared(model, FramePreprocessor().prepare(frames, stride)).pred
+    expected = model([f[..., ::-1] for f in frames]).pred
+
+    assert sum(len(p) for p in expected) > 0
+    for a, b in zip(prepared, expected):
+        torch.testing.assert_close(a, b, rtol=1e-4, atol=1e-3)
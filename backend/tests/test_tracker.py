@@ -0,0 +1,128 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.features.pipeline.tracker import LOST, TRACKED, KalmanBoxFilter, ObjectTracker, xyxy_to_cxcywh
+
+
+@pytest.fixture
+def tracker(settings):
+    settings()
+    return ObjectTracker(high_conf=0.5, match_iou=0.3, low_match_iou=0.2, max_lost_seconds=1.0, min_hits=2)
+
+
+@pytest.fixture
+def step(make_detections):
+    def feed(tracker, rows, now):
+        return tracker.update(make_detections(rows).numpy()[0], now)
+    return feed
+
+
+def _box(x, y, conf=0.9, cls=0, w=60, h=120):
+    return [x, y, x + w, y + h, conf, cls]
+
+
+def test_ids_stay_stable_for_moving_objects(tracker, step):
+    ids = []
+    for k in range(10):
+        t = k * 0.1
+        # two people walking towards each other, listed in alternating order
+        rows = [_box(100 + 12 * k, 100), _box(400 - 12 * k, 110)]
+        assigned, ended = step(tracker, rows if k % 2 else rows[::-1], t)
+        ids.append(tuple(assigned) if k % 2 else tuple(assigned[::-1]))
+        assert not ended
+
+    assert len(set(ids)) == 1
+    assert len(set(ids[0])) == 2 and -1 not in ids[0]
+    assert {t.id for t in tracker.live_tracks()} == set(ids[0])
+
+
+def test_track_is_confirmed_after_min_hits(tracker, step):
+    step(tracker, [_box(100, 100)], 0.0)
+    assert not tracker.live_tracks()
+    step(tracker, [_box(102, 100)], 0.1)
+    assert [t.state for t in tracker.tracks] == [TRACKED]
+
+
+def test_low_confidence_frame_keeps_track_alive(tracker, step):
+    first, _ = step(tracker, [_box(100, 100)], 0.0)
+    step(tracker, [_box(104, 100)], 0.1)
+    weak, _ = step(tracker, [_box(108, 100, conf=0.2)], 0.2)  # too weak to start a track, enough to keep one
+    assert weak[0] == first[0]
+    assert tracker.tracks[0].state == TRACKED
+
+
+def test_classes_are_never_mixed(tracker, step):
+    first, _ = step(tracker, [_box(100, 100, cls=0)], 0.0)
+    step(tracker, [_box(100, 100, cls=0)], 0.1)
+    other, _ = step(tracker, [_box(100, 100, cls=1)], 0.2)
+    assert other[0] != first[0]
+
+
+def test_lost_track_ends_after_max_lost_seconds(tracker, step):
+    assigned, _ = step(tracker, [_box(100, 100)], 0.0)
+    step(tracker, [_box(100, 100)], 0.1)
+
+    _, ended = step(tracker, [], 0.5)
+    assert not ended and tracker.tracks[0].state == LOST
+    back, _ = step(tracker, [_box(100, 100)], 0.6)  # re-found within the window: same id
+    assert back[0] == assigned[0]
+
+    step(tracker, [], 0.7)
+    _, ended = step(tracker, [], 1.8)
+    assert [t.id for t in ended] == [assigned[0]]
+    assert not tracker.tracks
+
+
+def test_tentative_track_dies_on_first_miss(tracker, step):
+    step(tracker, [_box(100, 100)], 0.0)
+    _, ended = step(tracker, [], 0.1)
+    assert len(ended) == 1 and not tracker.tracks
+
+
+def test_kalman_predicts_constant_velocity():
+    kf = KalmanBoxFilter()
+    mean, cov = kf.initiate(xyxy_to_cxcywh([[100, 100, 160, 220]]))
+    for k in range(1, 8):
+        mean, cov = kf.predict(mean, cov, np.array([0.1]))
+        mean, cov = kf.update(mean, cov, xyxy_to_cxcywh([[100 + 10 * k, 100, 160 + 10 * k, 220]]))
+
+    assert mean[0, 4] == pytest.approx(100, rel=0.2)  # 10 px per 0.1 s
+    ahead, _ = kf.predict(mean, cov, np.array([0.5]))
+    assert ahead[0, 0] == pytest.approx(130 + 70 + 50, abs=10)
+
+
+def _check(tracker, now, threshold=0.6):
+    """Run CameraStream._check_tracks (it only needs camera_id from the stream)."""
+    from app.features.pipeline.camera_stream import CameraStream
+
+    settings = SimpleNamespace(DETECTION_PERSISTENCE_SECONDS=1.0, TRACK_ALERT_GRACE_SECONDS=1.0,
+                               TRACK_ALERT_COOLDOWN_SECONDS=0.0)
+    stream = SimpleNamespace(camera_id="cam1")
+    return CameraStream._check_tracks(stream, "weapon", {0: "gun"}, tracker, threshold, settings, now)
+
+
+def test_alert_persistence_survives_a_short_dip(tracker, step):
+    alerts = {}
+    for k, conf in enumerate([0.9] * 6 + [0.55] + [0.9]):  # one 0.25 s dip below the alert threshold
+        t = k * 0.25
+        step(tracker, [_box(100, 100, conf=conf)], t)
+        alerts[t] = _check(tracker, t)
+
+    # confirmed (and persistence started) on the second frame, at 0.25
+    assert [t for t, a in alerts.items() if a] == [1.25, 1.75]
+    assert tracker.tracks[0].alert_since == 0.25
+
+
+def test_alert_persistence_restarts_after_the_grace_period(tracker, step):
+    confs = [0.9] * 6 + [0.55] * 6 + [0.9] * 5  # 1.5 s below the threshold, then back
+    alerts = {}
+    for k, conf in enumerate(confs):
+        t = k * 0.25
+        step(tracker, [_box(100, 100, conf=conf)], t)
+        alerts[t] = _check(tracker, t)
+
+    assert [t for t, a in alerts.items() if a] == [1.25, 4.0]  # back above at 3.0, alerts 1 s later again
+    assert tracker.tracks[0].alert_since == 3.0
+    assert tracker.tracks[0].below_since is None